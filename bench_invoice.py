@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+# Микро-бенчмарки парсера счетов из scratch_5 (без реальных PDF).
+import random
+import re
+import time
+import unicodedata
+
+import scratch_5 as inv
+
+
+def _timeit(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def _report(title, results):
+    base = results[0][1]
+    print(title)
+    for name, sec in results:
+        print(f"  {name:<28} {sec * 1000:9.2f} ms   x{base / sec:5.1f}")
+
+# --- assign_cells ---
+
+def _assign_cells_loop(line_words, columns, bins):
+    """Исходная версия assign_cells: линейный проход по bins для каждого слова."""
+    cells = {c: [] for c in columns}
+    for w in line_words:
+        cx = (w["x0"] + w["x1"]) / 2
+        bi = None
+        for i in range(len(bins)-1):
+            if bins[i] <= cx <= bins[i+1]:
+                bi = i
+                break
+        if bi is None:
+            continue
+        cells[columns[bi]].append(w["text"])
+    return {c: re.sub(r"\([^)]*\)", "", " ".join(v)).strip() for c, v in cells.items()}
+
+def synthetic_lines(n_lines=2000, n_dynamic=24, seed=0):
+    """Строки таблицы с n_dynamic динамическими колонками (Iltalisä (2), Yövuoro (3), ...)."""
+    rnd = random.Random(seed)
+    dyn = [f"{rnd.choice(['Iltalisä', 'Yövuoro', '50%', '100%'])} ({k})" for k in range(n_dynamic)]
+    columns = inv.REQ_FIRST + dyn + inv.REQ_LAST
+    xs = [30.0 + 28.0 * i for i in range(len(columns))]
+    bins = inv.build_bins(xs)
+    lines = []
+    for _ in range(n_lines):
+        ln = []
+        for x in xs:
+            x0 = x + rnd.uniform(-4, 4)
+            ln.append({"text": f"{rnd.randint(0, 9)},{rnd.randint(0, 9)}", "x0": x0, "x1": x0 + 12})
+        lines.append(ln)
+    return lines, columns, bins
+
+def bench_assign_cells(n_lines=2000, n_dynamic=24):
+    lines, columns, bins = synthetic_lines(n_lines, n_dynamic)
+
+    ref = [_assign_cells_loop(ln, columns, bins) for ln in lines]
+    assert ref == [inv.assign_cells(ln, columns, bins) for ln in lines]
+
+    _report(f"assign_cells: {n_lines} строк x {len(columns)} колонок", [
+        ("loop (исходный)", _timeit(lambda: [_assign_cells_loop(ln, columns, bins) for ln in lines])),
+        ("assign_cells (bisect)", _timeit(lambda: [inv.assign_cells(ln, columns, bins) for ln in lines])),
+    ])
+
+# --- cluster_lines ---
+
+def _cluster_lines_loop(words, y_tol=3):
+    """Исходная версия cluster_lines на словарях."""
+    lines = []
+    for w in sorted(words, key=lambda x: x["top"]):
+        if not lines:
+            lines.append([w]); continue
+        last = lines[-1]
+        if abs(w["top"] - last[-1]["top"]) <= y_tol:
+            last.append(w)
+        else:
+            lines.append([w])
+    for ln in lines:
+        ln.sort(key=lambda x: x["x0"])
+    return lines
+
+def synthetic_words(n_words=5000, seed=0):
+    """Слова страницы: строки через ~12pt с дрожанием top, x0 с повторами."""
+    rnd = random.Random(seed)
+    words = []
+    for k in range(n_words):
+        row = k // 20
+        words.append({
+            "text": f"w{k}",
+            "top": 40.0 + 12.0 * row + rnd.choice([0.0, 0.5, 1.25, 2.0]),
+            "x0": float(rnd.randrange(30, 560, 10)),
+        })
+    rnd.shuffle(words)
+    return words
+
+def bench_cluster_lines(n_words=5000):
+    words = synthetic_words(n_words)
+    assert _cluster_lines_loop(words) == inv.cluster_lines(words)
+
+    _report(f"cluster_lines: {n_words} слов", [
+        ("loop (исходный)", _timeit(lambda: _cluster_lines_loop(words))),
+        ("cluster_lines (numpy)", _timeit(lambda: inv.cluster_lines(words))),
+    ])
+
+# --- чистка таблицы (подстраховка против Tekijä:) ---
+
+def _clean_rows_loop(df):
+    """Подстраховка, как раньше: df.apply по строкам."""
+    mask = df.apply(lambda r: not any("tekijä:" in str(v).lower() for v in r.values), axis=1)
+    return df[mask].reset_index(drop=True)
+
+def synthetic_table(n_rows=100_000, seed=0):
+    """Таблица счёта после разбора: ~2% строк Tekijä: (их и ловит подстраховка)."""
+    import pandas as pd
+
+    rnd = random.Random(seed)
+    cols = inv.invoice_columns(["50%", "100%", "Iltalisä", "Yövuoro"])
+    rows = []
+    for k in range(n_rows):
+        r = rnd.random()
+        if r < 0.02:
+            rows.append({"Työntekijät": f"Tekijä: Etu{k}", "Aika": "", "Norm": ""})
+            continue
+        row = {"Työntekijät": f"Etu{k % 997} Suku{k % 311}", "Aika": "28.04.2025"}
+        for c in cols[2:]:
+            row[c] = f"{rnd.randint(0, 9)},{rnd.randint(0, 9)}"
+        rows.append(row)
+    return pd.DataFrame(rows, columns=cols)
+
+def bench_clean_table(n_rows=100_000):
+    import pandas as pd
+
+    df = synthetic_table(n_rows)
+    pd.testing.assert_frame_equal(_clean_rows_loop(df), inv.clean_invoice_df(df))
+
+    _report(f"чистка таблицы: {n_rows} строк x {df.shape[1]} колонок", [
+        ("apply по строкам (исходный)", _timeit(lambda: _clean_rows_loop(df), repeat=1)),
+        ("clean_invoice_df", _timeit(lambda: inv.clean_invoice_df(df), repeat=3)),
+    ])
+
+# --- деление Name -> Name + Surname ---
+
+def _add_surname_map(df):
+    """Исходный add_surname: split_name на каждую строку через map + zip."""
+    def split_name(full):
+        if not isinstance(full, str) or not full.strip():
+            return "", ""
+        parts = full.strip().split(" ", 1)
+        if len(parts) == 1:
+            return parts[0], ""
+        return parts[0], parts[1]
+
+    first_list, last_list = zip(*df["Name"].astype(object).map(split_name))
+    df = df.copy()
+    df["Name"] = list(first_list)
+    df["Surname"] = list(last_list)
+    cols = df.columns.tolist()
+    cols.remove("Surname")
+    cols.insert(cols.index("Name") + 1, "Surname")
+    return df[cols]
+
+def synthetic_names(n_rows=100_000, seed=0):
+    """Имена нескольких клиентов: 1-4 слова, частицы фамилий, пустые ячейки."""
+    import pandas as pd
+
+    rnd = random.Random(seed)
+    first = ["Anna", "Matti", "Jan", "Maria", "Olena", "Piotr", "Karl", "Aino"]
+    last = ["Virtanen", "Korhonen", "van der Berg", "af Klint", "Kowalski", "Mäkelä", "de la Cruz", "Shevchenko"]
+    names = []
+    for _ in range(n_rows):
+        r = rnd.random()
+        if r < 0.01:
+            names.append("")
+        elif r < 0.03:
+            names.append(rnd.choice(first))
+        elif r < 0.2:
+            names.append(f"{rnd.choice(first)} {rnd.choice(first)} {rnd.choice(last)}")
+        else:
+            names.append(f" {rnd.choice(first)} {rnd.choice(last)} ")
+    return pd.DataFrame({"Name": names, "Dates": "28.04.2025", "Salary": "7,5"})
+
+def bench_add_surname(n_rows=100_000):
+    import pandas as pd
+
+    df = synthetic_names(n_rows)
+    pd.testing.assert_frame_equal(_add_surname_map(df), inv.add_surname(df, "first"))
+    cat = df.astype({"Name": "category"})
+
+    _report(f"add_surname: {n_rows} имён", [
+        ("map(split_name) (исходный)", _timeit(lambda: _add_surname_map(df), repeat=3)),
+        ("split_names first", _timeit(lambda: inv.add_surname(df, "first"), repeat=3)),
+        ("split_names last", _timeit(lambda: inv.add_surname(df, "last"), repeat=3)),
+        ("split_names first, category", _timeit(lambda: inv.add_surname(cat, "first"), repeat=3)),
+    ])
+
+# --- свёртка диакритики (low_noacc) ---
+
+def _strip_accents_nfd(s):
+    """Исходная strip_accents: NFD + категория каждого символа."""
+    return "".join(ch for ch in unicodedata.normalize("NFD", s) if unicodedata.category(ch) != "Mn")
+
+def _low_noacc_nfd(s):
+    return _strip_accents_nfd(s).lower()
+
+def synthetic_page_lines(n_sections=4, n_rows=30, seed=0):
+    """Строки страницы счёта: шапка, строки сотрудников, Tekijä:, Kaikki yhteensä."""
+    rnd = random.Random(seed)
+    header_txt = ["Työntekijät", "Aika", "Norm", "50%", "100%", "Iltalisä", "Yövuoro", "Kaikki", "yhteensä"]
+    lines = []
+
+    def line(texts):
+        return [{"text": t, "x0": 30.0 + 50 * i, "x1": 70.0 + 50 * i} for i, t in enumerate(texts)]
+
+    for _ in range(n_sections):
+        lines.append(line(header_txt))
+        for _ in range(n_rows):
+            lines.append(line([f"Jääskeläinen{rnd.randint(1, 50)}", "Äijälä", "28.04.2025"]
+                              + [f"{rnd.randint(0, 9)},{rnd.randint(0, 9)}" for _ in range(5)]))
+        lines.append(line(["Tekijä:", "Mäkelä", "Öhman"]))
+        lines.append(line(["Kaikki", "yhteensä", "123,5"]))
+    return lines
+
+def _page_text_pass(lines):
+    """Работа парсера страницы, завязанная на low_noacc."""
+    for ln in lines:
+        if inv.is_header_line(ln):
+            inv.normalize_header(ln)
+        inv.is_total_line(ln)
+        any("tekijä:" in inv.low_noacc(w["text"]) for w in ln)
+
+def bench_accent_folding(n_pages=20):
+    pages = [synthetic_page_lines(seed=k) for k in range(n_pages)]
+    words = [w["text"] for p in pages for ln in p for w in ln]
+    assert [inv.low_noacc(t) for t in words] == [_low_noacc_nfd(t) for t in words]
+
+    def run_all():
+        for p in pages:
+            _page_text_pass(p)
+
+    saved = inv.strip_accents, inv.low_noacc
+    inv.strip_accents, inv.low_noacc = _strip_accents_nfd, _low_noacc_nfd
+    try:
+        t_old = _timeit(run_all)
+    finally:
+        inv.strip_accents, inv.low_noacc = saved
+    t_new = _timeit(run_all)
+
+    _report(f"свёртка диакритики: {n_pages} страниц, на страницу", [
+        ("NFD + unicodedata (исходный)", t_old / n_pages),
+        ("FOLD_TABLE + lru_cache", t_new / n_pages),
+    ])
+
+# --- сегментация страницы по шапкам ---
+
+def _parse_page_words_quadratic(words, y_tol=3):
+    """Исходный parse_page_words: stop_at ищется перебором всех шапок для каждой шапки."""
+    sections = []
+    lines = inv.cluster_lines(words, y_tol=y_tol)
+    headers = [i for i, ln in enumerate(lines) if inv.is_header_line(ln)]
+    for hi in headers:
+        layout = inv.header_layout(lines[hi])
+        if layout is None:
+            continue
+        cols, bins = layout
+        stop_at = len(lines)
+        for hj in headers:
+            if hj > hi:
+                stop_at = min(stop_at, hj)
+        body = []
+        for li in range(hi+1, stop_at):
+            ln = lines[li]
+            if inv.is_total_line(ln):
+                break
+            body.append(ln)
+        rows = []
+        for ln in body:
+            cells = inv.assign_cells(ln, cols, bins)
+            if any(inv.TEKIJA_MARK in v.lower() for v in cells.values() if v):
+                continue
+            if not cells.get("Työntekijät") and not cells.get("Aika"):
+                continue
+            rows.append(cells)
+        sections.append((cols, rows))
+    return sections
+
+def synthetic_dense_page(n_sections=60, n_rows=3, seed=0):
+    """
+    Слова одной страницы с n_sections повторами шапки; каждая секция — шапка, n_rows
+    строк, через раз Tekijä: и Kaikki yhteensä (без итога тело идёт до следующей шапки).
+    """
+    rnd = random.Random(seed)
+    header = ["Työntekijät", "Aika", "Norm", "50%", "100%", "Kaikki", "yhteensä"]
+    xs = [30.0, 130.0, 200.0, 250.0, 300.0, 350.0, 380.0]
+    words = []
+    top = 20.0
+
+    def line(texts, x_at):
+        nonlocal top
+        for t, x in zip(texts, x_at):
+            words.append({"text": t, "x0": x, "x1": x + 6.0 * len(t), "top": top})
+        top += 10.0
+
+    for k in range(n_sections):
+        line(header, xs)
+        for r in range(n_rows):
+            nums = [f"{rnd.randint(0, 12)},{rnd.randint(0, 9)}" for _ in range(4)]
+            line([f"Etu{k}_{r}", f"Suku{r}", "28.04.2025"] + nums, [30.0, 80.0] + xs[1:5] + [350.0])
+        if k % 2:
+            line(["Tekijä:", "Mäkelä"], xs[:2])
+            line(["Kaikki", "yhteensä", f"{rnd.randint(10, 99)},0"], [30.0, 60.0, 350.0])
+    return words
+
+def bench_segmentation(sections=(15, 60, 240)):
+    for n in sections:
+        words = synthetic_dense_page(n)
+        ref = _parse_page_words_quadratic(words)
+        new, _ = inv.parse_page_words(words)
+        assert ref == new and len(new) == n
+        assert sum(len(rows) for _, rows in new) == 3 * n
+
+        _report(f"сегментация: 1 страница, {n} шапок", [
+            ("stop_at перебором (исходный)", _timeit(lambda: _parse_page_words_quadratic(words))),
+            ("segment_page", _timeit(lambda: inv.parse_page_words(words))),
+        ])
+
+
+if __name__ == "__main__":
+    bench_assign_cells()
+    bench_cluster_lines()
+    bench_accent_folding()
+    bench_clean_table()
+    bench_segmentation()
+    bench_add_surname()
@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+# Синтетические счета субподрядчика (PDF) и бенчмарк parse_pdf_any_columns на них.
+# Реальные PDF клиентов не нужны: генератор рисует такую же таблицу через reportlab.
+#
+#   python bench_invoice_pdf.py                 # прогон набора CASES, результат в bench_results.jsonl
+#   python bench_invoice_pdf.py --compare       # сравнение двух последних прогонов
+#   python bench_invoice_pdf.py --crop letterhead   # crop_table против полного разбора страниц
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import scratch_5 as inv
+
+BENCH_DIR = Path("bench_data")            # сгенерированные PDF (переиспользуются между прогонами)
+RESULTS_PATH = Path("bench_results.jsonl")
+
+DYNAMIC_BASE = ["50%", "100%", "Iltalisä", "Yövuoro", "Urakka", "150%", "200%", "300%"]
+
+# набор сценариев по умолчанию
+CASES = {
+    "small":  dict(employees=40,  pages=5,   dynamic=4),
+    "medium": dict(employees=400, pages=60,  dynamic=4),
+    "wide":   dict(employees=200, pages=30,  dynamic=20),
+    "long":   dict(employees=1500, pages=300, dynamic=6),
+    # бланк с реквизитами над таблицей на каждой странице — сценарий для crop_table
+    "letterhead": dict(employees=400, pages=60, dynamic=4, letterhead_lines=40),
+}
+
+# только для сверки движков (--validate): страницы с /Rotate 0, 90, 180, 270 по очереди
+VALIDATE_CASES = {
+    "rotated": dict(employees=40, pages=4, dynamic=4, rotate_pages=True),
+}
+
+def dynamic_columns(n: int) -> list[str]:
+    """
+    n динамических колонок по кругу из DYNAMIC_BASE. Повторы остаются однословными —
+    normalize_header сам переименует их в 'Iltalisä (2)', 'Yövuoro (2)', ...
+    """
+    return [DYNAMIC_BASE[k % len(DYNAMIC_BASE)] for k in range(n)]
+
+def _fi_num(x: float) -> str:
+    return f"{x:.1f}".replace(".", ",")
+
+def generate_invoice_pdf(path, employees: int = 40, pages: int = 5, dynamic: int = 4,
+                         tekija: bool = True, letterhead: bool = True, letterhead_lines: int = 0,
+                         rotate_pages: bool = False, seed: int = 0) -> str:
+    """
+    Счёт в формате subcontractor follow-up: на каждой странице шапка таблицы
+    (Työntekijät, Aika, Norm, динамические колонки, Kaikki yhteensä), строки сотрудников,
+    блок "Tekijä: ..." и строка "Kaikki yhteensä". employees строк делятся по pages страницам.
+    letterhead_lines > 0 — столько строк реквизитов над таблицей на каждой странице.
+    rotate_pages — у страницы p атрибут /Rotate = 90 * p (по кругу 0, 90, 180, 270).
+    """
+    try:
+        from reportlab.lib.pagesizes import A4, landscape
+        from reportlab.pdfgen import canvas
+    except ImportError as e:
+        raise RuntimeError("для генерации PDF нужен reportlab (pip install reportlab)") from e
+
+    rnd = random.Random(seed)
+    dyn = dynamic_columns(dynamic)
+    cols = ["Työntekijät", "Aika", "Norm"] + dyn + ["Kaikki yhteensä"]
+
+    width, height = landscape(A4) if dynamic > 8 else A4
+    font_size = 7 if dynamic <= 12 else 5
+    name_w, date_w = 110, 90
+    num_w = (width - 40 - name_w - date_w - 60) / (len(cols) - 2)
+    xs = [20, 20 + name_w] + [20 + name_w + date_w + i * num_w for i in range(len(cols) - 2)]
+
+    c = canvas.Canvas(str(path), pagesize=(width, height))
+    start = date(2025, 4, 28)
+    per_page = [employees // pages + (1 if p < employees % pages else 0) for p in range(pages)]
+    emp = 0
+    for p in range(pages):
+        if rotate_pages:
+            c.setPageRotation(90 * p % 360)
+        c.setFont("Helvetica", font_size)
+        y = height - 30
+        if letterhead and p == 0:
+            for txt in ("Subcontractor follow-up", "Invoice 2025001863", "Period 28.04.2025 - 25.05.2025",
+                        "Customer Oy, Teollisuuskatu 1, 00510 Helsinki"):
+                c.drawString(20, y, txt)
+                y -= 12
+            y -= 20
+        for k in range(letterhead_lines):
+            c.drawString(20, y, f"Subcontractor Oy, Teollisuuskatu {k + 1}, 00510 Helsinki, "
+                                f"Y-tunnus 1234567-{k % 10}, IBAN FI12 3456 7890 1234 {k:02d}")
+            y -= 11
+
+        for lab, x in zip(cols, xs):
+            c.drawString(x, y, lab)
+        y -= 14
+
+        for _ in range(per_page[p]):
+            d = start + timedelta(days=rnd.randint(0, 27))
+            values = [rnd.choice([0, 7.5, 8, 10, 12]) for _ in range(1 + len(dyn))]
+            c.drawString(xs[0], y, f"Etunimi{emp % 97} Sukunimi{emp}")
+            c.drawString(xs[1], y, d.strftime("%d.%m.%Y"))
+            for v, x in zip(values + [sum(values)], xs[2:]):
+                c.drawString(x, y, _fi_num(v))
+            y -= 11
+            emp += 1
+            if y < 60:
+                break
+
+        if tekija:
+            c.drawString(xs[0], y, "Tekijä: Projektipäällikkö Mäkelä")
+            y -= 11
+        c.drawString(xs[0], y, "Kaikki yhteensä")
+        c.drawString(xs[-1], y, _fi_num(rnd.uniform(100, 900)))
+        c.showPage()
+    c.save()
+    return str(path)
+
+def case_pdf(name: str, params: dict) -> Path:
+    """PDF сценария в BENCH_DIR; генерируется один раз на набор параметров."""
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    tag = "_".join(f"{k}{v}" for k, v in sorted(params.items()))
+    path = BENCH_DIR / f"{name}_{tag}.pdf"
+    if not path.exists():
+        generate_invoice_pdf(path, **params)
+    return path
+
+def git_revision() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+        return out.stdout.strip()
+    except Exception:
+        return ""
+
+def bench_case(name: str, params: dict, repeat: int = 3, workers: int = 1, engine: str = "pdfplumber") -> dict:
+    """Лучшее время из repeat прогонов + пиковая память (отдельным прогоном под tracemalloc)."""
+    path = case_pdf(name, params)
+
+    best = float("inf")
+    rows = 0
+    for _ in range(repeat):
+        inv.clear_layout_cache()
+        t0 = time.perf_counter()
+        df = inv.parse_pdf_any_columns(str(path), workers=workers, engine=engine)
+        best = min(best, time.perf_counter() - t0)
+        rows = len(df)
+
+    inv.clear_layout_cache()
+    tracemalloc.start()
+    try:
+        inv.parse_pdf_any_columns(str(path), workers=1, engine=engine)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "case": name,
+        **params,
+        "workers": workers,
+        "engine": engine,
+        "rows": rows,
+        "seconds": round(best, 4),
+        "pages_per_s": round(params["pages"] / best, 2),
+        "peak_mib": round(peak / 2**20, 2),
+    }
+
+def run_benchmarks(cases=None, repeat: int = 3, workers: int = 1, engine: str = "pdfplumber",
+                   results_path=RESULTS_PATH) -> list[dict]:
+    cases = cases or list(CASES)
+    meta = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git": git_revision(),
+        "parser_version": inv.PARSER_VERSION,
+        "python": platform.python_version(),
+    }
+    results = []
+    for name in cases:
+        res = {**meta, **bench_case(name, CASES[name], repeat=repeat, workers=workers, engine=engine)}
+        print(f"{name:<8} {res['pages']:>4} pages {res['rows']:>6} rows  "
+              f"{res['seconds']:8.3f} s  {res['pages_per_s']:8.1f} pages/s  peak {res['peak_mib']:7.1f} MiB")
+        results.append(res)
+    if results_path:
+        with open(results_path, "a", encoding="utf-8") as f:
+            for res in results:
+                f.write(json.dumps(res, ensure_ascii=False) + "\n")
+    return results
+
+def compare_results(results_path=RESULTS_PATH):
+    """Последний прогон против предыдущего по каждому сценарию (и числу воркеров)."""
+    if not Path(results_path).exists():
+        print("нет результатов:", results_path)
+        return
+    runs = {}
+    with open(results_path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                r = json.loads(line)
+                runs.setdefault((r["case"], r.get("workers", 1), r.get("engine", "pdfplumber")), []).append(r)
+    for (case, workers, engine), rs in sorted(runs.items()):
+        if len(rs) < 2:
+            print(f"{case} (workers={workers}, {engine}): один прогон")
+            continue
+        prev, last = rs[-2], rs[-1]
+        print(f"{case} (workers={workers}, {engine}): {prev['git'] or '?'} -> {last['git'] or '?'}  "
+              f"{prev['seconds']:.3f} s -> {last['seconds']:.3f} s (x{prev['seconds'] / last['seconds']:.2f}), "
+              f"peak {prev['peak_mib']:.1f} -> {last['peak_mib']:.1f} MiB")
+
+def bench_crop_table(cases=("letterhead",), repeat: int = 3):
+    """crop_table=True против обычного разбора: лучшее из repeat, таблицы должны совпасть."""
+    for name in cases:
+        path = str(case_pdf(name, CASES[name]))
+        ref = inv.build_invoice_df(path)
+        times = {}
+        for crop in (False, True):
+            best = float("inf")
+            for _ in range(repeat):
+                inv.clear_layout_cache()
+                t0 = time.perf_counter()
+                df = inv.build_invoice_df(path, crop_table=crop)
+                best = min(best, time.perf_counter() - t0)
+            assert df.equals(ref), name
+            times[crop] = best
+        print(f"{name:<10} {CASES[name]['pages']:>4} pages  полный разбор {times[False]:8.3f} s  "
+              f"crop_table {times[True]:8.3f} s  x{times[False] / times[True]:.2f}")
+
+def validate_engines(cases=None) -> bool:
+    """
+    compare_engines на PDF сценариев (по умолчанию CASES и VALIDATE_CASES): движок pdfminer
+    должен давать те же слова и таблицы.
+    """
+    all_cases = {**CASES, **VALIDATE_CASES}
+    ok = True
+    for name in cases or list(all_cases):
+        diffs = inv.compare_engines(str(case_pdf(name, all_cases[name])))
+        print(f"{name:<10} {'ok' if not diffs else f'{len(diffs)} расхождений'}")
+        for page, msg in diffs[:10]:
+            print(f"  page {page}: {msg}")
+        ok = ok and not diffs
+    return ok
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Бенчмарк parse_pdf_any_columns на синтетических счетах")
+    ap.add_argument("cases", nargs="*", help=f"сценарии из {', '.join(CASES)} (по умолчанию все)")
+    ap.add_argument("-r", "--repeat", type=int, default=3)
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--engine", choices=inv.ENGINES, default="pdfplumber")
+    ap.add_argument("--validate", action="store_true", help="сверить движки pdfplumber и pdfminer")
+    ap.add_argument("--results", default=str(RESULTS_PATH))
+    ap.add_argument("--compare", action="store_true", help="только сравнить два последних прогона")
+    ap.add_argument("--crop", action="store_true", help="сравнить crop_table с полным разбором страниц")
+    ap.add_argument("--generate", metavar="PDF", help="только сгенерировать PDF (параметры сценария small)")
+    args = ap.parse_args(argv)
+    unknown = [c for c in args.cases if c not in CASES and not (args.validate and c in VALIDATE_CASES)]
+    if unknown:
+        ap.error(f"неизвестные сценарии: {', '.join(unknown)}")
+
+    if args.generate:
+        print(generate_invoice_pdf(args.generate, **CASES["small"]))
+        return
+    if args.compare:
+        compare_results(args.results)
+        return
+    if args.validate:
+        raise SystemExit(0 if validate_engines(args.cases or None) else 1)
+    if args.crop:
+        bench_crop_table(args.cases or ("letterhead",), repeat=args.repeat)
+        return
+    run_benchmarks(args.cases or None, repeat=args.repeat, workers=args.workers, engine=args.engine,
+                   results_path=args.results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+# Бенчмарки разбора расчётных листков из scratch_14 (без реальных PDF).
+import io
+import random
+import statistics
+import time
+from pathlib import Path
+
+import scratch_14 as ps
+
+
+def _timeit(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def _report(title, results):
+    base = results[0][1]
+    print(title)
+    for name, sec in results:
+        print(f"  {name:<28} {sec * 1000:9.2f} ms   x{base / sec:5.1f}")
+
+# --- синтетические страницы ---
+
+SURNAMES = ["Virtanen", "Korhonen", "Mäkelä", "Kowalski", "Shevchenko", "O'Brien", "Nieminen-Lahti"]
+NAMES = ["Anna", "Matti", "Olena", "Piotr", "Aino Maria", "Jan"]
+
+FIELD_LINES = [
+    "Normaali työ {h} h {r} € {t} €",
+    "Hourly salary {h} {r} {t}",
+    "Ylityö 50 % {h} h {r2} {t}",
+    "Overtime, weekday 50 % {h} {r2} {t}",
+    "Ylityö 100% {h} {r2} {t}",
+    "Overtime 100 % {h} {r2} {t}",
+    "Ylityö, vrk 150 % {h} {r2} {t}",
+    "Overtime 150 % {h} {r2} {t}",           # совпадает и с меткой 50 %
+    "Ylityö vrk 200 % {h} {r2} {t}",
+    "Overtime, sunday 200% {h} {r2} {t}",
+    "Sunnuntai ylityöl+300% {h} {r2} {t}",
+    "Sunnuntai ylityö 300 % {h} {r2} {t}",
+    "Evening work allowance {h} {r2} {t}",
+]
+
+def _num(rnd, lo, hi):
+    v = rnd.uniform(lo, hi)
+    if v >= 1000 and rnd.random() < 0.5:
+        return f"{int(v):,}".replace(",", " ") + f",{rnd.randint(0, 99):02d}"
+    return f"{v:.2f}".replace(".", rnd.choice([",", "."]))
+
+def synthetic_payslip_text(seed=0, n_filler=40):
+    """Текст страницы как из PyPDF2: шапка, имя, строки с метками вперемешку с прочим."""
+    rnd = random.Random(seed)
+    lines = [
+        "PALKKALASKELMA / PAYSLIP",
+        "Account number: FI12 3456 7890 1234 56",
+        f"{rnd.choice(SURNAMES)}, {rnd.choice(NAMES)}  Social security number 010190-123A",
+        "Period 28.04.2025 - 11.05.2025   Payday 15.05.2025",
+    ]
+    body = rnd.sample(FIELD_LINES, rnd.randint(3, len(FIELD_LINES)))
+    body += [f"Muu rivi {k}  {_num(rnd, 0, 50)}  {_num(rnd, 0, 5000)}" for k in range(n_filler)]
+    rnd.shuffle(body)
+    for ln in body:
+        lines.append(ln.format(h=_num(rnd, 0, 80), r=_num(rnd, 10, 30), r2=_num(rnd, 5, 45),
+                               t=_num(rnd, 0, 3000)))
+    if rnd.random() < 0.3:
+        lines.append("Normaali työ")                 # метка без чисел в конце страницы
+    return "\n".join(lines)
+
+BENCH_DIR = Path("bench_data")            # сгенерированные PDF (переиспользуются между прогонами)
+
+def generate_payslips_pdf(path, pages: int = 500, n_filler: int = 20, seed: int = 0,
+                          attachment_every: int = 5) -> str:
+    """
+    Пачка листков: по synthetic_payslip_text на страницу; каждая attachment_every-я —
+    приложение без Account number (обложки, сводки).
+    """
+    try:
+        from reportlab.pdfgen import canvas
+    except ImportError as e:
+        raise RuntimeError("для генерации PDF нужен reportlab (pip install reportlab)") from e
+
+    c = canvas.Canvas(str(path))
+    for k in range(pages):
+        c.setFont("Helvetica", 8)
+        y = 810
+        for ln in synthetic_payslip_text(seed=seed + k, n_filler=n_filler).splitlines():
+            if k % attachment_every == attachment_every - 1 and ln.startswith("Account number"):
+                ln = "Liite / Attachment"
+            c.drawString(30, y, ln)
+            y -= 11
+        c.showPage()
+    c.save()
+    return str(path)
+
+def bundle_pdf(pages: int, attachment_every: int = 5) -> Path:
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    suffix = "" if attachment_every == 5 else f"_a{attachment_every}"
+    path = BENCH_DIR / f"payslips_{pages}{suffix}.pdf"
+    if not path.exists():
+        generate_payslips_pdf(path, pages=pages, attachment_every=attachment_every)
+    return path
+
+# --- метки полей: один проход против семи ---
+
+def _fields_per_label(text):
+    """Как было: extract_rate + шесть extract_qty, каждая со своей нормализацией."""
+    return {
+        "Rate per hour": ps.extract_rate(text),
+        "Overtime 50%":  ps.extract_qty(text, ps.OT50_LABEL_RE),
+        "Overtime 100%": ps.extract_qty(text, ps.OT100_LABEL_RE),
+        "Overtime 150%": ps.extract_qty(text, ps.OT150_LABEL_RE),
+        "Overtime 200%": ps.extract_qty(text, ps.OT200_LABEL_RE),
+        "Overtime 300%": ps.extract_qty(text, ps.OT300_LABEL_RE),
+        "Evening shift/ hours": ps.extract_qty(text, ps.EVENING_LABEL_RE),
+    }
+
+def bench_scan_fields(n_pages=500):
+    pages = [synthetic_payslip_text(seed=k) for k in range(n_pages)]
+    for text in pages:
+        assert _fields_per_label(text) == ps.scan_fields(ps.normalize_page_text(text)), text
+
+    _report(f"метки полей: {n_pages} страниц", [
+        ("7 поисков + 7 нормализаций", _timeit(lambda: [_fields_per_label(t) for t in pages])),
+        ("scan_fields", _timeit(lambda: [ps.scan_fields(ps.normalize_page_text(t)) for t in pages])),
+    ])
+
+# --- поиск имени: регулярки против NameScanner ---
+
+def _find_name_regex(text):
+    """Прежний find_name на PATTERN_WITH_COMMA / PATTERN_NO_COMMA."""
+    for pat in (ps.PATTERN_WITH_COMMA, ps.PATTERN_NO_COMMA):
+        for ln in (ln.strip() for ln in text.splitlines() if ln.strip()):
+            m = pat.search(ln)
+            if m:
+                return ps.strip_tails(m["name"]), ps.strip_tails(m["surname"])
+    m = ps.PATTERN_WITH_COMMA.search(text) or ps.PATTERN_NO_COMMA.search(text)
+    if m:
+        return ps.strip_tails(m["name"]), ps.strip_tails(m["surname"])
+    return None
+
+def pathological_pages(n_words):
+    """Строки, на которых регулярки уходят в бэктрекинг: стоп-слово в конце длинной строки и т.п."""
+    return {
+        "слова + стоп-слово": " ".join(["Virtanen"] * n_words) + "-IBAN",
+        "слова, запятые": ", ".join(["Anna Maria"] * n_words) + " IBAN",
+        "дефисы": "-".join(["a"] * n_words) + " " + "-".join(["b"] * n_words) + "Address",
+        "нет имени": " ".join(["Mäkelä"] * n_words),
+    }
+
+def bench_find_name(sizes=(100, 200, 400, 800), regex_max=800):
+    pages = [ps.normalize_page_text(synthetic_payslip_text(seed=k)) for k in range(500)]
+    assert [_find_name_regex(t) for t in pages] == [ps.find_name(t) for t in pages]
+    _report("поиск имени: 500 обычных страниц", [
+        ("регулярки (исходный)", _timeit(lambda: [_find_name_regex(t) for t in pages], repeat=3)),
+        ("find_name", _timeit(lambda: [ps.find_name(t) for t in pages], repeat=3)),
+    ])
+
+    print("поиск имени: патологические строки, мкс на символ")
+    for n in sizes:
+        for title, text in pathological_pages(n).items():
+            t_new = _timeit(lambda: ps.find_name(text), repeat=1)
+            line = f"  {title:<20} {n:>5} слов  find_name {t_new / len(text) * 1e6:7.3f}"
+            if n <= regex_max:
+                assert _find_name_regex(text) == ps.find_name(text)
+                t_old = _timeit(lambda: _find_name_regex(text), repeat=1)
+                line += f"   регулярки {t_old / len(text) * 1e6:9.3f}"
+            print(line)
+
+# --- pdfminer: текст по страницам ---
+
+def _pdfminer_texts_reopen(pdf_path):
+    """Прежний fallback: файл открывается и разбирается заново для каждой страницы."""
+    from pdfminer.high_level import extract_text_to_fp
+    from pdfminer.layout import LAParams
+    from pdfminer.pdfpage import PDFPage
+
+    with open(pdf_path, "rb") as fh:
+        for i, _ in enumerate(PDFPage.get_pages(fh)):
+            buf = io.StringIO()
+            with open(pdf_path, "rb") as f2:
+                extract_text_to_fp(f2, buf, laparams=LAParams(), page_numbers=[i])
+            yield buf.getvalue()
+
+def bench_pdfminer_pages(sizes=(50, 100, 250, 500), reopen_max=500):
+    """
+    Время на страницу по размеру пачки: у линейного прохода оно не растёт с числом страниц.
+    Прежний вариант на 500 страницах идёт пару минут — reopen_max ограничивает его прогон.
+    """
+    print("pdfminer fallback: мс на страницу")
+    for n in sizes:
+        path = str(bundle_pdf(n))
+        t0 = time.perf_counter()
+        texts = list(ps.iter_pdfminer_page_texts(path))
+        t_new = time.perf_counter() - t0
+        line = f"  {n:>4} pages  один проход {t_new / n * 1000:7.2f}"
+        if n <= reopen_max:
+            t0 = time.perf_counter()
+            assert list(_pdfminer_texts_reopen(path)) == texts
+            t_old = time.perf_counter() - t0
+            line += f"   переоткрытие {t_old / n * 1000:7.2f}   x{t_old / t_new:5.1f}"
+        print(line)
+
+# --- PyPDF2: пул процессов по диапазонам страниц ---
+
+def bench_extract_workers(pages=500, workers=(1, 2, 4)):
+    path = str(bundle_pdf(pages))
+    ref = ps.extract_names_from_pdf(path, workers=1)
+    results = []
+    for w in workers:
+        t0 = time.perf_counter()
+        df = ps.extract_names_from_pdf(path, workers=w)
+        results.append((f"workers={w}", time.perf_counter() - t0))
+        assert df.equals(ref)
+    _report(f"extract_names_from_pdf: {pages} страниц, {len(ref)} листков", results)
+
+# --- отсев страниц без метки до extract_text ---
+
+def bench_marker_prefilter(pages=500, attachment_every=(None, 5, 2), repeat=5):
+    """
+    prefilter=False против True на пачках с разной долей приложений (None — одни листки).
+    Прогоны чередуются, чтобы фоновая нагрузка делилась поровну; печатается медиана.
+    """
+    for every in attachment_every:
+        path = str(bundle_pdf(pages, attachment_every=every or pages + 1))
+        ref = ps.extract_names_from_pdf(path, prefilter=False)
+        before = dict(ps.MARKER_STATS)
+        assert ps.extract_names_from_pdf(path, prefilter=True).equals(ref)
+        stats = {k: v - before[k] for k, v in ps.MARKER_STATS.items()}
+
+        times = {False: [], True: []}
+        for _ in range(repeat):
+            for prefilter in (False, True):
+                t0 = time.perf_counter()
+                ps.extract_names_from_pdf(path, prefilter=prefilter)
+                times[prefilter].append(time.perf_counter() - t0)
+        mix = "одни листки" if every is None else f"приложение каждая {every}-я"
+        _report(f"отсев по потоку: {pages} страниц, {mix}, {stats}, медиана из {repeat}", [
+            ("extract_text на всех", statistics.median(times[False])),
+            ("page_marker_hint", statistics.median(times[True])),
+        ])
+
+
+if __name__ == "__main__":
+    bench_scan_fields()
+    bench_find_name()
+    bench_pdfminer_pages()
+    bench_extract_workers()
+    bench_marker_prefilter()
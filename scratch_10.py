@@ -1,9 +1,14 @@
 # -*- coding: utf-8 -*-
+import json
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
 from openpyxl import load_workbook
 
 # ----- ПУТИ -----
-WEEKS_XLSX = r"tyontekijat_weeks.xlsx"   # файл с 1st week / 2nd week
+WEEKS_STORE = r"tyontekijat_weeks"       # колоночное хранилище из scratch_5 (weeks.json + *.arrow)
+WEEKS_XLSX = r"tyontekijat_weeks.xlsx"   # файл с 1st week / 2nd week (если хранилища нет)
 GENERATED_XLSX = r"generated.xlsx"       # файл, куда писать людей, начиная с 8-й строки
 
 # ===== ВСПОМОГАТЕЛЬНАЯ ФУНКЦИЯ ПОИСКА КОЛОНКИ =====
@@ -67,9 +72,31 @@ def resolve_col(df_columns, logical_name: str):
     return None
 
 
+# ===== ЧТЕНИЕ НЕДЕЛИ =====
+def read_week(sheet: str) -> pd.DataFrame:
+    """
+    Неделя из хранилища WEEKS_STORE (Arrow через memory map) или лист из WEEKS_XLSX —
+    из того, что записано позже (scratch_5 мог писать только одно из двух).
+    Пустые строки и float32 приводятся к тому, что дал бы xlsx: NaN и float64 с округлением.
+    """
+    manifest = Path(WEEKS_STORE) / "weeks.json"
+    xlsx = Path(WEEKS_XLSX)
+    if not manifest.exists() or (xlsx.exists() and xlsx.stat().st_mtime > manifest.stat().st_mtime):
+        return pd.read_excel(xlsx, sheet_name=sheet)
+
+    import pyarrow.feather as feather
+
+    weeks = {w["sheet"]: w["file"] for w in json.loads(manifest.read_text(encoding="utf-8"))["weeks"]}
+    df = feather.read_table(Path(WEEKS_STORE) / weeks[sheet], memory_map=True).to_pandas()
+    for c in df.columns:
+        if df[c].dtype == "float32":
+            df[c] = df[c].astype("float64").round(6)
+    return df.replace("", np.nan)
+
+
 # ===== ЧИТАЕМ ОБА ЛИСТА =====
-df_w1_full = pd.read_excel(WEEKS_XLSX, sheet_name="1st week")
-df_w2_full = pd.read_excel(WEEKS_XLSX, sheet_name="2nd week")
+df_w1_full = read_week("1st week")
+df_w2_full = read_week("2nd week")
 
 # Берём только ключи для списка людей
 df_w1_keys = df_w1_full[["Name", "Surname"]].copy()
@@ -1,4 +1,6 @@
+import base64
 import re
+import zlib
 from pathlib import Path
 import pandas as pd
 
@@ -45,6 +47,31 @@ OT300_LABEL_RE = re.compile(r"(?i)sunnuntai\s+ylity[oö](?:l\+)?\s*300\s*%")
 # Evening shift hours
 EVENING_LABEL_RE = re.compile(r"(?i)evening\s+work\s+allowance")
 
+# Поля строки результата: (колонка, метка, какое по счёту число после метки берём)
+FIELD_LABELS = [
+    ("Rate per hour",        RATE_LABEL_RE,    1),   # unit price — второе число
+    ("Overtime 50%",         OT50_LABEL_RE,    0),
+    ("Overtime 100%",        OT100_LABEL_RE,   0),
+    ("Overtime 150%",        OT150_LABEL_RE,   0),
+    ("Overtime 200%",        OT200_LABEL_RE,   0),
+    ("Overtime 300%",        OT300_LABEL_RE,   0),
+    ("Evening shift/ hours", EVENING_LABEL_RE, 0),
+]
+
+# Все метки начинаются с одного из этих слов. Один проход по странице находит начала
+# слов (lookahead — в т.ч. внутри другой метки), полная метка проверяется только там.
+LABEL_SCAN_RE = re.compile(
+    r"(?i)(?=(?P<rate>normaali|hourly)|(?P<ylityo>ylity)|(?P<overtime>overtime)"
+    r"|(?P<sunday>sunnuntai)|(?P<evening>evening))"
+)
+LABEL_FAMILIES = {
+    "rate": ["Rate per hour"],
+    "ylityo": ["Overtime 50%", "Overtime 100%", "Overtime 150%", "Overtime 200%"],
+    "overtime": ["Overtime 50%", "Overtime 100%", "Overtime 150%", "Overtime 200%"],
+    "sunday": ["Overtime 300%"],
+    "evening": ["Evening shift/ hours"],
+}
+
 # Числа (с поддержкой тысячных разделителей и знака)
 NUMBER_RE = re.compile(r"(?<!\d)(-?\d{1,3}(?:[ .]\d{3})*(?:[.,]\d+)|-?\d+[.,]\d+|-?\d+)(?!\d)")
 
@@ -66,21 +93,132 @@ def normalize_page_text(text: str) -> str:
     return text
 
 def handle_page_text(text: str) -> tuple[str, str] | None:
-    text = normalize_page_text(text)
+    return find_name(normalize_page_text(text))
 
-    for ln in (ln.strip() for ln in text.splitlines() if ln.strip()):
-        m = PATTERN_WITH_COMMA.search(ln)
-        if m:
-            return strip_tails(m["name"]), strip_tails(m["surname"])
-    for ln in (ln.strip() for ln in text.splitlines() if ln.strip()):
-        m = PATTERN_NO_COMMA.search(ln)
-        if m:
-            return strip_tails(m["name"]), strip_tails(m["surname"])
-    m = PATTERN_WITH_COMMA.search(text) or PATTERN_NO_COMMA.search(text)
+def find_name(text: str) -> tuple[str, str] | None:
+    """
+    (имя, фамилия) в уже нормализованном тексте страницы. Короткие строки — регулярками
+    (их бэктрекинг ограничен длиной строки), длинные строки и весь текст — NameScanner.
+    """
+    scanners = {}
+    for comma, pat in ((True, PATTERN_WITH_COMMA), (False, PATTERN_NO_COMMA)):
+        for ln in (ln.strip() for ln in text.splitlines() if ln.strip()):
+            if len(ln) <= NAME_REGEX_MAX_LINE:
+                m = pat.search(ln)
+                if m:
+                    return strip_tails(m["name"]), strip_tails(m["surname"])
+                continue
+            if ln not in scanners:
+                scanners[ln] = NameScanner(ln)
+            m = scanners[ln].search(comma)
+            if m:
+                return strip_tails(m[1]), strip_tails(m[0])
+    sc = NameScanner(text)
+    m = sc.search(True) or sc.search(False)
     if m:
-        return strip_tails(m["name"]), strip_tails(m["surname"])
+        return strip_tails(m[1]), strip_tails(m[0])
     return None
 
+# --- Поиск имени без бэктрекинга ---
+
+NAME_REGEX_MAX_LINE = 120   # строки длиннее — только через NameScanner
+
+NAME_RUN_RE = re.compile(r"[A-Za-zĀ-ž'’\-]+")
+WORD_BOUNDARY_RE = re.compile(r"\b")
+SPACES_RE = re.compile(r"\s*")
+STOPWORD_START_RE = re.compile(rf"(?=(?:{'|'.join(map(re.escape, TAIL_STOPWORDS))}))")
+LINE_BREAK_RE = re.compile(r"[\r\n]")
+
+class NameScanner:
+    """
+    Те же совпадения, что PATTERN_WITH_COMMA / PATTERN_NO_COMMA .search(text), но за
+    линейное время: текст один раз режется на слова (непрерывные куски NAME_WORD),
+    дальше каждая возможная позиция начала проверяется за O(1).
+
+    Почему это эквивалентно регулярке:
+      - слово внутри фамилии/имени всегда целый кусок: за ним должен идти пробел,
+        запятая или \\s, а при укорачивании за ним оказался бы символ того же куска;
+      - укорачивать есть смысл только последнее слово имени (ради \\b) — берём самую
+        правую границу слова внутри куска;
+      - lookahead со стоп-словами: чем левее конец, тем больше остаток строки, так что
+        если не подошла самая правая граница, не подойдёт и более левая.
+    Порядок перебора (раньше начало, больше слов в фамилии, больше слов в имени)
+    повторяет порядок бэктрекинга регулярки.
+    """
+    def __init__(self, text: str):
+        self.text = text
+        runs = [(m.start(), m.end()) for m in NAME_RUN_RE.finditer(text)]
+        self.runs = runs
+        self.run_at = {a: k for k, (a, _) in enumerate(runs)}
+        # следующее слово через ровно один пробел
+        self.next_run = [self.run_at.get(b + 1) if text[b:b + 1] == " " else None for _, b in runs]
+
+        bounds = [m.start() for m in WORD_BOUNDARY_RE.finditer(text)]
+        stops = [m.start() for m in STOPWORD_START_RE.finditer(text)]
+        breaks = [m.start() for m in LINE_BREAK_RE.finditer(text)] + [len(text)]
+
+        # starts — (позиция начала, кусок): границы слова, попавшие на символ куска;
+        # end_ok[k] — правая граница слова в куске k, если после неё в строке нет стоп-слов
+        self.starts = []
+        self.end_ok = [None] * len(runs)
+        bi = si = li = 0
+        for k, (a, b) in enumerate(runs):
+            while bi < len(bounds) and bounds[bi] < a:
+                bi += 1
+            last = None
+            while bi < len(bounds) and bounds[bi] <= b:
+                if bounds[bi] < b:
+                    self.starts.append((bounds[bi], k))
+                if bounds[bi] > a:
+                    last = bounds[bi]
+                bi += 1
+            if last is None:
+                continue
+            while si < len(stops) and stops[si] < last:
+                si += 1
+            while breaks[li] < last:
+                li += 1
+            if si == len(stops) or stops[si] >= breaks[li]:
+                self.end_ok[k] = last
+        self._spaces = {}
+
+    def _skip_spaces(self, pos: int) -> int:
+        if pos not in self._spaces:
+            self._spaces[pos] = SPACES_RE.match(self.text, pos).end()
+        return self._spaces[pos]
+
+    def _chain(self, k: int) -> list[int]:
+        """Кусок k и до трёх следующих через один пробел."""
+        chain = [k]
+        while len(chain) < 4 and self.next_run[chain[-1]] is not None:
+            chain.append(self.next_run[chain[-1]])
+        return chain
+
+    def search(self, comma: bool) -> tuple[str, str] | None:
+        """(фамилия, имя) первого совпадения или None."""
+        text, runs = self.text, self.runs
+        for s, k in self.starts:
+            surname = self._chain(k)
+            for i in range(len(surname) - 1, -1, -1):
+                se = runs[surname[i]][1]
+                if comma:
+                    p = self._skip_spaces(se)
+                    if text[p:p + 1] != ",":
+                        continue
+                    q = self._skip_spaces(p + 1)
+                else:
+                    if not text[se:se + 1].isspace():
+                        continue
+                    q = self._skip_spaces(se)
+                if q not in self.run_at:
+                    continue
+                name = self._chain(self.run_at[q])
+                for j in range(len(name) - 1, -1, -1):
+                    end = self.end_ok[name[j]]
+                    if end is not None:
+                        return text[s:se], text[q:end]
+        return None
+
 def _to_float(num_str: str) -> float | None:
     s = num_str.strip().replace("\u00A0", " ")
     if "," in s and "." in s:
@@ -111,73 +249,301 @@ def extract_qty(text: str, label_pat: re.Pattern) -> float | None:
     nums = _numbers_after(label_pat, text, need=1)
     return _to_float(nums[0]) if nums else None
 
+def scan_fields(text: str) -> dict:
+    """
+    Все поля FIELD_LABELS за один проход по нормализованному тексту страницы.
+    Для каждого поля — первое совпадение его метки, как у extract_rate/extract_qty.
+    """
+    labels = {col: (pat, idx) for col, pat, idx in FIELD_LABELS}
+    found = {}
+    for m in LABEL_SCAN_RE.finditer(text):
+        for col in LABEL_FAMILIES[m.lastgroup]:
+            if col in found:
+                continue
+            lm = labels[col][0].match(text, m.start())
+            if lm:
+                found[col] = lm.end()
+        if len(found) == len(labels):
+            break
+
+    res = {}
+    for col, (_, idx) in labels.items():
+        val = None
+        if col in found:
+            for k, nm in enumerate(NUMBER_RE.finditer(text, found[col])):
+                if k == idx:
+                    val = _to_float(nm.group(1))
+                    break
+        res[col] = val
+    return res
+
 def page_has_marker(text: str) -> bool:
     return bool(PAGE_MARKER_RE.search(text or ""))
 
+# --- Быстрый отсев страниц без "Account number" (до extract_text) ---
+
+# True — страницы без метки отсеиваются по потоку содержимого до extract_text. Выключено:
+# на пачках, где приложений мало, разбор потока стоит больше, чем экономит
+# (см. bench_payslips.bench_marker_prefilter)
+MARKER_PREFILTER = False
+MARKER_STATS = {"pages": 0, "skipped": 0, "unknown": 0, "extracted": 0}
+
+MARKER_COMPACT = "accountnumber"   # PAGE_MARKER_RE без пробелов и регистра
+PDF_LITERAL_RE = re.compile(rb"\((?:[^()\\]|\\.)*\)", re.DOTALL)
+PDF_HEX_STRING_RE = re.compile(rb"<([0-9A-Fa-f\s]*)>")
+PDF_ESCAPE_RE = re.compile(rb"\\([0-7]{1,3}|\r\n|.)", re.DOTALL)
+PDF_INLINE_IMAGE_RE = re.compile(rb"(?:^|\s)BI\s")
+PDF_FONT_OP_RE = re.compile(rb"/([^\s/\[\]()<>{}%]+)\s+[-+\d.]+\s+Tf\b")
+PDF_ESCAPES = {b"n": b"\n", b"r": b"\r", b"t": b"\t", b"b": b"\b", b"f": b"\f",
+               b"\r\n": b"", b"\n": b"", b"\r": b""}
+
+def _unescape_literal(m: re.Match) -> bytes:
+    esc = m.group(1)
+    if esc[:1].isdigit():
+        return bytes([int(esc, 8) & 0xFF])
+    return PDF_ESCAPES.get(esc, esc)
+
+def _stream_bytes(stream) -> bytes:
+    """
+    Раскодированный поток. Flate/ASCII85 без DecodeParms — через zlib/base64 (у PyPDF2
+    ASCII85 на чистом Python и медленнее самого отсева), остальное — stream.get_data().
+    """
+    stream = stream.get_object()
+    filters = stream.get("/Filter")
+    filters = [] if filters is None else [filters] if isinstance(filters, str) else list(filters)
+    data = getattr(stream, "_data", None)
+    if data is None or stream.get("/DecodeParms") is not None \
+            or not set(filters) <= {"/FlateDecode", "/ASCII85Decode"}:
+        return stream.get_data()
+    try:
+        for f in filters:
+            if f == "/ASCII85Decode":
+                data = data.strip()
+                data = base64.a85decode(data[:-2] if data.endswith(b"~>") else data)
+            else:
+                data = zlib.decompress(data)
+        return data
+    except Exception:
+        return stream.get_data()
+
+def _font_is_plain(font) -> bool:
+    """
+    Простой шрифт, у которого байт строки = символ в extract_text: Type1/TrueType без
+    ToUnicode и без /Differences. Составные (Type0), Type3 и перекодированные — нет.
+    """
+    font = font.get_object()
+    if font.get("/Subtype") not in ("/Type1", "/TrueType", "/MMType1") or "/ToUnicode" in font:
+        return False
+    enc = font.get("/Encoding")
+    if enc is None:
+        return True
+    enc = enc.get_object()
+    return isinstance(enc, str) or "/Differences" not in enc
+
+def page_marker_hint(page, font_cache: dict) -> bool | None:
+    """
+    Есть ли на странице метка, по сырому потоку содержимого, без extract_text:
+    False — точно нет (все строки потока склеены и метки в них нет), True — есть,
+    None — не понять (сложные шрифты, Form XObject, inline-картинки) — нужен extract_text.
+    font_cache — решения по шрифтам (шрифты общие для страниц документа).
+    """
+    res = page.get("/Resources")
+    res = res.get_object() if res is not None else {}
+    xobjects = res.get("/XObject")
+    for ref in (xobjects.get_object().values() if xobjects is not None else []):
+        if ref.get_object().get("/Subtype") == "/Form":
+            return None
+
+    contents = page.get("/Contents")
+    if contents is None:
+        return False
+    contents = contents.get_object()
+    if isinstance(contents, list):
+        data = b"\n".join(_stream_bytes(c) for c in contents)
+    else:
+        data = _stream_bytes(contents)
+    if PDF_INLINE_IMAGE_RE.search(data):
+        return None
+    # проверяются только шрифты, выбранные на странице (Tf), а не все из /Resources
+    fonts = res.get("/Font")
+    fonts = fonts.get_object() if fonts is not None else {}
+    for name in set(PDF_FONT_OP_RE.findall(data)):
+        ref = fonts.get("/" + name.decode("latin-1"))
+        if ref is None:
+            return None
+        key = getattr(ref, "idnum", None) or id(ref)
+        if key not in font_cache:
+            font_cache[key] = _font_is_plain(ref)
+        if not font_cache[key]:
+            return None
+    literals = PDF_LITERAL_RE.findall(data)
+    hexes = PDF_HEX_STRING_RE.findall(data)
+    rest = PDF_HEX_STRING_RE.sub(b"", PDF_LITERAL_RE.sub(b"", data))
+    if b"(" in rest or b")" in rest:
+        return None   # вложенные скобки в строках — не разбираем
+    raw = PDF_ESCAPE_RE.sub(_unescape_literal, b"".join(lit[1:-1] for lit in literals))
+    for h in hexes:
+        h = "".join(h.decode("ascii").split())
+        raw += bytes.fromhex(h + "0" * (len(h) % 2))   # нечётная длина — дописывается 0
+    text = "".join(raw.decode("latin-1").split()).lower()
+    return MARKER_COMPACT in text
+
+def iter_pdfminer_page_texts(pdf_path: str):
+    """
+    Текст страниц через pdfminer за один проход по одному открытому файлу — тот же
+    текст, что extract_text_to_fp(..., laparams=LAParams(), page_numbers=[i]),
+    но документ разбирается один раз, а не заново на каждую страницу.
+    """
+    import io
+    from pdfminer.converter import TextConverter
+    from pdfminer.layout import LAParams
+    from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+    from pdfminer.pdfpage import PDFPage
+
+    rsrcmgr = PDFResourceManager()
+    buf = io.StringIO()
+    device = TextConverter(rsrcmgr, buf, laparams=LAParams())
+    interpreter = PDFPageInterpreter(rsrcmgr, device)
+    try:
+        with open(pdf_path, "rb") as fh:
+            for page in PDFPage.get_pages(fh):
+                interpreter.process_page(page)
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate(0)
+    finally:
+        device.close()
+
 # --- Основная функция ---
 
-def extract_names_from_pdf(pdf_path: str) -> pd.DataFrame:
-    rows: list[dict] = []
-    used_pypdf2 = False
-
-    def process_text(text: str):
-        res = handle_page_text(text)
-        if not res:
-            return
-        name, surname = res
-        row = {
-            "Surname": surname,
-            "Name": name,
-            "Rate per hour": extract_rate(text),
-            "Overtime 50%":  extract_qty(text, OT50_LABEL_RE),
-            "Overtime 100%": extract_qty(text, OT100_LABEL_RE),
-            "Overtime 150%": extract_qty(text, OT150_LABEL_RE),
-            "Overtime 200%": extract_qty(text, OT200_LABEL_RE),
-            "Overtime 300%": extract_qty(text, OT300_LABEL_RE),
-            "Evening shift/ hours": extract_qty(text, EVENING_LABEL_RE),
-        }
-        rows.append(row)
-
-    # PyPDF2
+WORKERS = 1          # >1 — страницы PyPDF2 разбираются в пуле процессов (см. extract_names_from_pdf)
+CHUNKS_PER_WORKER = 4  # диапазонов страниц на процесс — чтобы медленные диапазоны не тормозили пул
+
+COLUMNS = ["Surname", "Name", "Rate per hour",
+           "Overtime 50%", "Overtime 100%", "Overtime 150%",
+           "Overtime 200%", "Overtime 300%",
+           "Evening shift/ hours"]
+
+def process_text(text: str) -> dict | None:
+    """Строка результата для страницы листка или None, если имени на странице нет."""
+    text = normalize_page_text(text)   # один раз на страницу
+    res = find_name(text)
+    if not res:
+        return None
+    name, surname = res
+    return {"Surname": surname, "Name": name, **scan_fields(text)}
+
+def page_ranges(n_pages: int, n_chunks: int):
+    """Делим [0, n_pages) на n_chunks непрерывных диапазонов."""
+    n_chunks = max(1, min(n_chunks, n_pages))
+    step, extra = divmod(n_pages, n_chunks)
+    ranges = []
+    start = 0
+    for k in range(n_chunks):
+        stop = start + step + (1 if k < extra else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+def extract_rows_pypdf2(pdf_path: str, start: int = 0, stop: int | None = None,
+                        prefilter: bool = MARKER_PREFILTER) -> tuple[list[dict], bool, dict]:
+    """
+    Строки со страниц [start, stop) через свой PdfReader. (rows, ok, stats): при ошибке PyPDF2
+    возвращаются строки, собранные до неё, и ok=False — как при последовательном проходе.
+    prefilter — страницы, где page_marker_hint уверенно не видит метку, extract_text не
+    проходят; stats — счётчики как в MARKER_STATS.
+    """
+    rows = []
+    stats = dict.fromkeys(MARKER_STATS, 0)
+    font_cache = {}
     try:
         import PyPDF2
         with open(pdf_path, "rb") as f:
             reader = PyPDF2.PdfReader(f)
-            for page in reader.pages:
+            for i in range(start, len(reader.pages) if stop is None else stop):
+                page = reader.pages[i]
+                stats["pages"] += 1
+                if prefilter:
+                    try:
+                        hint = page_marker_hint(page, font_cache)
+                    except Exception:
+                        hint = None
+                    if hint is False:
+                        stats["skipped"] += 1
+                        continue
+                    if hint is None:
+                        stats["unknown"] += 1
+                stats["extracted"] += 1
                 text = page.extract_text() or ""
                 if page_has_marker(text):
-                    process_text(text)
-        used_pypdf2 = True
+                    row = process_text(text)
+                    if row:
+                        rows.append(row)
+    except Exception:
+        return rows, False, stats
+    return rows, True, stats
+
+def extract_rows_pypdf2_parallel(pdf_path: str, workers: int,
+                                 prefilter: bool = MARKER_PREFILTER) -> tuple[list[dict], bool, dict]:
+    """extract_rows_pypdf2 по диапазонам страниц в пуле процессов; строки в порядке страниц."""
+    stats = dict.fromkeys(MARKER_STATS, 0)
+    try:
+        import PyPDF2
+        with open(pdf_path, "rb") as f:
+            n_pages = len(PyPDF2.PdfReader(f).pages)
     except Exception:
-        pass
+        return [], False, stats
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    ranges = page_ranges(n_pages, workers * CHUNKS_PER_WORKER)
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        futures = [ex.submit(extract_rows_pypdf2, pdf_path, start, stop, prefilter) for start, stop in ranges]
+        for fut in futures:
+            part, ok, part_stats = fut.result()
+            rows.extend(part)
+            for k, v in part_stats.items():
+                stats[k] += v
+            if not ok:
+                for rest in futures:
+                    rest.cancel()
+                return rows, False, stats
+    return rows, True, stats
+
+def extract_names_from_pdf(pdf_path: str, workers: int = WORKERS,
+                           prefilter: bool = MARKER_PREFILTER) -> pd.DataFrame:
+    """
+    Строка на каждую страницу листка (с "Account number" и именем).
+    workers > 1 — страницы делятся на диапазоны между процессами, у каждого свой PdfReader;
+    порядок строк — как у страниц.
+    prefilter — обложки, сводки и прочие страницы без метки отсеиваются по сырому потоку
+    содержимого (page_marker_hint); счётчики копятся в MARKER_STATS.
+    """
+    if workers > 1:
+        rows, used_pypdf2, stats = extract_rows_pypdf2_parallel(pdf_path, workers, prefilter)
+    else:
+        rows, used_pypdf2, stats = extract_rows_pypdf2(pdf_path, prefilter=prefilter)
+    for k, v in stats.items():
+        MARKER_STATS[k] += v
 
     # pdfminer fallback
     if not used_pypdf2 and not rows:
         try:
-            from pdfminer.high_level import extract_text_to_fp
-            from pdfminer.layout import LAParams
-            from pdfminer.pdfpage import PDFPage
-            import io
-            with open(pdf_path, "rb") as fh:
-                for i, _ in enumerate(PDFPage.get_pages(fh)):
-                    buf = io.StringIO()
-                    with open(pdf_path, "rb") as f2:
-                        extract_text_to_fp(f2, buf, laparams=LAParams(), page_numbers=[i])
-                    text = buf.getvalue()
-                    if page_has_marker(text):
-                        process_text(text)
+            for text in iter_pdfminer_page_texts(pdf_path):
+                if page_has_marker(text):
+                    row = process_text(text)
+                    if row:
+                        rows.append(row)
         except Exception:
             pass
 
-    cols = ["Surname", "Name", "Rate per hour",
-            "Overtime 50%", "Overtime 100%", "Overtime 150%",
-            "Overtime 200%", "Overtime 300%",
-            "Evening shift/ hours"]
-    return pd.DataFrame(rows, columns=cols)
+    return pd.DataFrame(rows, columns=COLUMNS)
 
 # --- Пример запуска ---
 if __name__ == "__main__":
     pdf_file = r"C:\Users\nikit\AppData\Roaming\JetBrains\PyCharm2023.3\scratches\w21-w22 payslips copy.pdf"
-    df = extract_names_from_pdf(pdf_file)
+    df = extract_names_from_pdf(pdf_file, workers=WORKERS)
     print(df.to_string(index=False))
+    print("marker prefilter:", MARKER_STATS)
     df.to_excel(r"names.xlsx", index=False)
@@ -1,44 +1,141 @@
 # -*- coding: utf-8 -*-
+import argparse
+import glob
+import hashlib
+import json
+import os
+import pickle
 import re
+import time
+import tracemalloc
 import unicodedata
+from bisect import bisect_left
+from functools import lru_cache
 from pathlib import Path
+import numpy as np
 import pandas as pd
 import pdfplumber
 
+try:
+    import psutil  # необязателен: без него RSS берётся из /proc (см. rss_bytes)
+except ImportError:
+    psutil = None
+
 # Пути к обоим PDF
 PDF_PATH_W21 = r"C:\Users\nikit\Downloads\w21 inv 28_04_2025_25_05_2025_subcontractor_followup_2025001863 copy (1).pdf"
 PDF_PATH_W22 = r"C:\Users\nikit\Downloads\w22 inv 06_05_2025_01_06_2025_subcontractor_followup_2025001952 copy.pdf"
 
 OUT_XLSX = "tyontekijat_weeks.xlsx"
+# Колоночное хранилище для следующего скрипта (scratch_10): Arrow IPC (Feather v2) по файлу
+# на неделю + weeks.json. Без сжатия, чтобы читать через memory map; xlsx — только для людей.
+OUT_WEEKS_DIR = "tyontekijat_weeks"
+WEEKS_MANIFEST = "weeks.json"
+
+WORKERS = 1  # >1 — страницы PDF разбираются параллельно в пуле процессов
+CROP_TABLE = False  # True — слова извлекаются только из области таблицы (см. parse_page)
+PAGE_MEM_LIMIT = None  # байты прироста RSS; при превышении PDF переоткрывается (см. iter_pdf_pages)
+PAGE_REOPEN_MIN_PAGES = 16  # не чаще одного переоткрытия на столько страниц
+MEM_REPORT = False     # True — печатать пиковую память по страницам (tracemalloc)
+
+# Дисковый кэш результатов разбора (None — без кэша)
+PARSE_CACHE_DIR = ".invoice_cache"
+PARSE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+PAGE_STORE_STATS = {"hits": 0, "misses": 0}  # постраничный кэш (см. iter_page_sections)
+
+# Менять при любом изменении логики разбора — старые записи кэша станут недействительны
+PARSER_VERSION = 6
+
+# Параметры извлечения слов и склейки строк (входят в ключ кэша)
+WORD_KW = dict(x_tolerance=2, y_tolerance=2, keep_blank_chars=False, use_text_flow=True)
+Y_TOL = 3
+
+# Режим crop_table: после первой найденной шапки слова извлекаются только из полосы
+# начиная чуть выше шапки (шапка фирмы/письма сверху не анализируется)
+TABLE_CROP_MARGIN = 10
 
 REQ_FIRST = ["Työntekijät", "Aika", "Norm"]          # обязательные в начале
 REQ_LAST  = ["Kaikki yhteensä"]                      # обязательная последняя
 
+TEKIJA_MARK = "tekijä:"    # строки с "Tekijä: ..." — подписи, а не сотрудники
+
+# typed-режим: текстовые колонки -> category, остальные (часы/суммы) -> float32
+TEXT_COLS = ["Työntekijät", "Aika"]
+NUM_DTYPE = "float32"
+
+# Кэш раскладки шапки: сигнатура шапки -> (cols, bins) или None, если шапка не подходит.
+# Живёт на уровне модуля, поэтому работает между страницами и между файлами одного запуска.
+LAYOUT_CACHE = {}
+LAYOUT_CACHE_MAX = 256
+LAYOUT_X_ROUND = 1          # округление x0 в сигнатуре (знаков после запятой)
+LAYOUT_STATS = {"hits": 0, "misses": 0}
+
+def fold_char(ch: str) -> str:
+    """Один символ без диакритики (NFD + выкинуть Mn)."""
+    return "".join(c for c in unicodedata.normalize("NFD", ch) if unicodedata.category(c) != "Mn")
+
+class FoldTable(dict):
+    """Таблица для str.translate: код символа -> символ без диакритики, заполняется по мере встречи."""
+    def __missing__(self, code):
+        folded = fold_char(chr(code))
+        self[code] = folded
+        return folded
+
+# ä, ö, å и прочая латиница заранее; остальное — лениво через __missing__
+FOLD_TABLE = FoldTable()
+for _code in range(0xC0, 0x250):
+    FOLD_TABLE[_code]
+del _code
+
 def strip_accents(s: str) -> str:
-    return "".join(ch for ch in unicodedata.normalize("NFD", s) if unicodedata.category(ch) != "Mn")
+    if s.isascii():
+        return s
+    return s.translate(FOLD_TABLE)
 
+@lru_cache(maxsize=8192)
 def low_noacc(s: str) -> str:
     return strip_accents(s).lower()
 
 def rm_parens(s: str) -> str:
+    if "(" not in s:
+        return s.strip()
     return re.sub(r"\([^)]*\)", "", s).strip()
 
 def join_words(words):
     return " ".join(w["text"] for w in words)
 
+def cluster_line_slices(top, x0, y_tol=3):
+    """
+    Склейка слов в строки по массивам координат.
+    Возвращает (order, bounds): строка k — это слова order[bounds[k]:bounds[k+1]],
+    внутри строки отсортированные по x0.
+    """
+    top = np.asarray(top, dtype=float)
+    x0 = np.asarray(x0, dtype=float)
+    if not len(top):
+        return np.empty(0, dtype=np.intp), np.zeros(1, dtype=np.intp)
+
+    by_top = np.argsort(top, kind="stable")
+    # новая строка там, где слово ниже предыдущего больше чем на y_tol
+    breaks = np.flatnonzero(np.diff(top[by_top]) > y_tol) + 1
+    line_id = np.zeros(len(top), dtype=np.intp)
+    line_id[breaks] = 1
+    line_id = np.cumsum(line_id)
+
+    # lexsort стабилен: внутри строки по x0, при равных x0 — в порядке по top
+    order = by_top[np.lexsort((x0[by_top], line_id))]
+    bounds = np.concatenate(([0], breaks, [len(top)]))
+    return order, bounds
+
 def cluster_lines(words, y_tol=3):
-    lines = []
-    for w in sorted(words, key=lambda x: x["top"]):
-        if not lines:
-            lines.append([w]); continue
-        last = lines[-1]
-        if abs(w["top"] - last[-1]["top"]) <= y_tol:
-            last.append(w)
-        else:
-            lines.append([w])
-    for ln in lines:
-        ln.sort(key=lambda x: x["x0"])
-    return lines
+    if not words:
+        return []
+    top = np.fromiter((w["top"] for w in words), dtype=float, count=len(words))
+    x0 = np.fromiter((w["x0"] for w in words), dtype=float, count=len(words))
+    order, bounds = cluster_line_slices(top, x0, y_tol=y_tol)
+    order = order.tolist()
+    bounds = bounds.tolist()
+    return [[words[i] for i in order[a:b]] for a, b in zip(bounds, bounds[1:])]
 
 def is_header_line(line_words):
     t = low_noacc(join_words(line_words))
@@ -123,18 +220,82 @@ def build_bins(x_list):
     mids = [(xs_sorted[i] + xs_sorted[i+1]) / 2 for i in range(len(xs_sorted)-1)]
     return [-float("inf")] + mids + [float("inf")]
 
+def header_signature(line_words):
+    """Сигнатура шапки: тексты слов + округлённые x0."""
+    return tuple((w["text"].strip(), round(w["x0"], LAYOUT_X_ROUND)) for w in line_words)
+
+def header_layout(line_words):
+    """
+    (cols, bins) для строки-шапки или None, если шапка не подходит.
+    Одинаковые шапки (по header_signature) считаются один раз.
+    """
+    sig = header_signature(line_words)
+    if sig in LAYOUT_CACHE:
+        LAYOUT_STATS["hits"] += 1
+        return LAYOUT_CACHE[sig]
+    LAYOUT_STATS["misses"] += 1
+
+    header_items = normalize_header(line_words)
+    if header_items:
+        cols = [lab for lab,_ in header_items]
+        xs   = [x   for _,x in header_items]
+        layout = (cols, build_bins(xs))
+    else:
+        layout = None
+
+    if len(LAYOUT_CACHE) >= LAYOUT_CACHE_MAX:
+        LAYOUT_CACHE.clear()
+    LAYOUT_CACHE[sig] = layout
+    return layout
+
+def layout_cache_info():
+    return {"hits": LAYOUT_STATS["hits"], "misses": LAYOUT_STATS["misses"], "size": len(LAYOUT_CACHE)}
+
+def clear_layout_cache():
+    LAYOUT_CACHE.clear()
+    LAYOUT_STATS["hits"] = LAYOUT_STATS["misses"] = 0
+
+# Счётчики, которые воркеры пула возвращают родителю: в дочернем процессе они копятся
+# в его собственной копии модуля и без этого терялись бы
+WORKER_STATS = {"layout": LAYOUT_STATS, "page_store": PAGE_STORE_STATS}
+
+def worker_stats_snapshot():
+    return {name: dict(stats) for name, stats in WORKER_STATS.items()}
+
+def worker_stats_since(before):
+    """Прирост счётчиков WORKER_STATS с момента снимка before (процесс пула переиспользуется)."""
+    return {name: {k: v - before[name][k] for k, v in stats.items()} for name, stats in WORKER_STATS.items()}
+
+def merge_worker_stats(delta):
+    for name, stats in delta.items():
+        for k, v in stats.items():
+            WORKER_STATS[name][k] += v
+
+def bins_monotonic(bins):
+    return all(bins[i] <= bins[i+1] for i in range(len(bins)-1))
+
 def assign_cells(line_words, columns, bins):
     cells = {c: [] for c in columns}
-    for w in line_words:
-        cx = (w["x0"] + w["x1"]) / 2
-        bi = None
-        for i in range(len(bins)-1):
-            if bins[i] <= cx <= bins[i+1]:
-                bi = i
-                break
-        if bi is None:
-            continue
-        cells[columns[bi]].append(w["text"])
+    if bins_monotonic(bins):
+        # границы отсортированы — колонка ищется бинарным поиском по серединам
+        mids = bins[1:-1]
+        for w in line_words:
+            cx = (w["x0"] + w["x1"]) / 2
+            if cx != cx:  # NaN
+                continue
+            cells[columns[bisect_left(mids, cx)]].append(w["text"])
+    else:
+        # "Kaikki yhteensä" переставлена в конец — старый линейный проход
+        for w in line_words:
+            cx = (w["x0"] + w["x1"]) / 2
+            bi = None
+            for i in range(len(bins)-1):
+                if bins[i] <= cx <= bins[i+1]:
+                    bi = i
+                    break
+            if bi is None:
+                continue
+            cells[columns[bi]].append(w["text"])
     # склеим и уберём скобки
     return {c: rm_parens(" ".join(v)).strip() for c, v in cells.items()}
 
@@ -142,73 +303,669 @@ def is_total_line(line_words):
     t = low_noacc(join_words(line_words))
     return ("kaikki yhteensa" in t) and ("tyontekijat" not in t)
 
-def parse_pdf_any_columns(pdf_path: str) -> pd.DataFrame:
-    all_rows = []
-    dynamic_order_global = []  # порядок появления нестандартных колонок
+class ParseProfile:
+    """
+    Время и счётчики по стадиям разбора — суммарно и по каждой странице.
+    on_page(record) вызывается после каждой разобранной страницы.
+    Без профиля (profile=None) парсер не делает ни одного лишнего замера.
+    """
+    STAGES = ("extract_words", "cluster_lines", "headers", "assign_cells")
+    COUNTS = ("words", "lines", "rows")
 
-    with pdfplumber.open(pdf_path) as pdf:
-        for page_idx, page in enumerate(pdf.pages, start=1):
-            words = page.extract_words(
-                x_tolerance=2,
-                y_tolerance=2,
-                keep_blank_chars=False,
-                use_text_flow=True
-            )
-            if not words:
+    def __init__(self, on_page=None):
+        self.on_page = on_page
+        self.totals = {"pages": 0, **dict.fromkeys(self.STAGES, 0.0), **dict.fromkeys(self.COUNTS, 0)}
+        self.pages = []
+        self._page = None
+
+    def start_page(self, page_idx):
+        self._page = {"page": page_idx, **dict.fromkeys(self.STAGES, 0.0), **dict.fromkeys(self.COUNTS, 0)}
+
+    def add(self, key, value):
+        self._page[key] += value
+
+    def end_page(self):
+        rec, self._page = self._page, None
+        for k in self.STAGES + self.COUNTS:
+            self.totals[k] += rec[k]
+        self.totals["pages"] += 1
+        self.pages.append(rec)
+        if self.on_page is not None:
+            self.on_page(rec)
+
+    def report(self) -> dict:
+        return {"totals": dict(self.totals), "pages": list(self.pages)}
+
+    def to_json(self, path: str | None = None) -> str:
+        text = json.dumps(self.report(), ensure_ascii=False, indent=2)
+        if path:
+            Path(path).write_text(text, encoding="utf-8")
+        return text
+
+def parse_page(page, y_tol=Y_TOL, crop_state=None, profile=None):
+    """
+    Разбор одной страницы: список (cols, rows) для каждой шапки таблицы на странице.
+    rows — уже отфильтрованные словари ячеек.
+    crop_state — dict, общий для страниц одного прохода (режим crop_table): в нём
+    запоминается верх первой шапки, и дальше в словари символов pdfplumber переводятся
+    только символы ниже него (см. band_words).
+    Если в обрезанной области шапки нет или шапка есть в отрезанной полосе над ней
+    (там начинается своя таблица), страница читается целиком.
+    profile — ParseProfile для замеров по стадиям (или None).
+    """
+    if profile is not None:
+        profile.start_page(page.page_number)
+    sections = None
+    if crop_state and crop_state.get("top") is not None:
+        x0, y0, x1, y1 = page.bbox
+        top = max(y0, crop_state["top"] - TABLE_CROP_MARGIN)
+        words = band_words(page, (x0, top, x1, y1), profile) if top < y1 else None
+        if words is not None:
+            sections, _ = parse_page_words(words, y_tol=y_tol, profile=profile)
+
+    if not sections:
+        words = extract_page_words(page, profile)
+        sections, header_top = parse_page_words(words, y_tol=y_tol, profile=profile)
+        if crop_state is not None and header_top is not None:
+            prev = crop_state.get("top")
+            crop_state["top"] = header_top if prev is None else min(prev, header_top)
+
+    if profile is not None:
+        profile.add("rows", sum(len(rows) for _, rows in sections))
+        profile.end_page()
+    return sections
+
+def band_words(page, bbox, profile=None):
+    """
+    Слова полосы bbox — те же, что page.crop(bbox).extract_words(**WORD_KW), но без
+    page.chars: тот переводит в словари все символы страницы (на бланке с реквизитами
+    это дороже интерпретации самого PDF). Здесь в словари идут только LTChar, задевающие
+    полосу, а у символов над ней смотрится лишь текст.
+    None — выше полосы есть "Työntekijät": там начинается своя таблица, нужна вся страница.
+    """
+    t0 = time.perf_counter()
+    top = bbox[1]
+    # top символа в pdfplumber = height - y1 + mediabox[1]; limit — это top в координатах pdfminer
+    limit = page.height + page.mediabox[1] - top
+    above, band = [], []
+    for ch in iter_ltchars(page.layout):
+        if ch.y1 > limit:
+            above.append(ch.get_text())
+        if ch.y0 < limit:
+            band.append(ch)
+    if "tyontekijat" in strip_accents("".join(above)).lower():
+        return None
+    chars = pdfplumber.utils.crop_to_bbox([page.process_object(ch) for ch in band], bbox)
+    words = pdfplumber.utils.extract_words(chars, **WORD_KW)
+    if profile is not None:
+        profile.add("extract_words", time.perf_counter() - t0)
+        profile.add("words", len(words))
+    return words
+
+def extract_page_words(page, profile=None):
+    if profile is None:
+        return page.extract_words(**WORD_KW)
+    t0 = time.perf_counter()
+    words = page.extract_words(**WORD_KW)
+    profile.add("extract_words", time.perf_counter() - t0)
+    profile.add("words", len(words))
+    return words
+
+def segment_page(lines):
+    """
+    Блоки страницы за один проход по строкам: [(hi, start, stop), ...], где hi — строка
+    шапки, lines[start:stop] — тело таблицы под ней. Тело кончается на строке
+    "Kaikki yhteensä" или на следующей шапке.
+    """
+    blocks = []
+    open_block = None          # [hi, start, stop] блока, чьё тело ещё не закрыто
+    for i, ln in enumerate(lines):
+        if is_header_line(ln):
+            if open_block is not None:
+                open_block[2] = i
+            open_block = [i, i + 1, len(lines)]
+            blocks.append(open_block)
+        elif open_block is not None and is_total_line(ln):
+            open_block[2] = i
+            open_block = None
+    return [tuple(b) for b in blocks]
+
+def parse_page_words(words, y_tol=Y_TOL, profile=None):
+    """
+    Разбор слов страницы: (sections, header_top), header_top — верх первой
+    подходящей шапки или None.
+    """
+    sections = []
+    header_top = None
+    if not words:
+        return sections, header_top
+
+    if profile is not None:
+        t0 = time.perf_counter()
+    lines = cluster_lines(words, y_tol=y_tol)
+    if profile is not None:
+        t1 = time.perf_counter()
+        profile.add("cluster_lines", t1 - t0)
+        profile.add("lines", len(lines))
+    blocks = segment_page(lines)
+    if profile is not None:
+        profile.add("headers", time.perf_counter() - t1)
+
+    for hi, start, stop in blocks:
+        if profile is not None:
+            t0 = time.perf_counter()
+        layout = header_layout(lines[hi])
+        if profile is not None:
+            t1 = time.perf_counter()
+            profile.add("headers", t1 - t0)
+        if layout is None:
+            continue
+        cols, bins = layout
+        if header_top is None:
+            header_top = min(w["top"] for w in lines[hi])
+
+        rows = []
+        for ln in lines[start:stop]:
+            cells = assign_cells(ln, cols, bins)
+            # фильтруем Tekijä:
+            if any(TEKIJA_MARK in v.lower() for v in cells.values() if v):
                 continue
+            # пустые строки выкидываем
+            if not cells.get("Työntekijät") and not cells.get("Aika"):
+                continue
+            rows.append(cells)
+        sections.append((cols, rows))
+        if profile is not None:
+            profile.add("assign_cells", time.perf_counter() - t1)
+    return sections, header_top
+
+def rss_bytes():
+    """Текущий RSS процесса в байтах: psutil, если стоит, иначе /proc; None — узнать нельзя."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
 
-            lines = cluster_lines(words, y_tol=3)
-            headers = [i for i, ln in enumerate(lines) if is_header_line(ln)]
-            if not headers:
+def iter_pdf_pages(pdf_path: str, indices=None, mem_limit: int | None = None, mem_report=None):
+    """
+    (i, page) по одной странице, i с 0. После каждой страницы её кэши (chars, layout)
+    освобождаются через page.close().
+    mem_limit — на сколько байт RSS может вырасти процесс с момента открытия PDF: если
+    больше, PDF переоткрывается, чтобы сбросить кэши объектов pdfminer. Точка отсчёта
+    снимается заново после каждого переоткрытия, и между переоткрытиями проходит не
+    меньше PAGE_REOPEN_MIN_PAGES страниц — иначе память, которую держит не PDF, заставляла
+    переоткрывать его после каждой страницы. Без psutil и /proc лимит не действует.
+    mem_report — список, в который дописывается {"page", "peak_bytes", "current_bytes"}
+    для каждой страницы (по tracemalloc; он замедляет разбор, поэтому только для отчёта).
+    """
+    trace = mem_report is not None
+    started = trace and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    pdf = pdfplumber.open(pdf_path)
+    base = rss_bytes() if mem_limit is not None else None
+    since_open = 0
+    try:
+        if indices is None:
+            indices = range(len(pdf.pages))
+        for i in indices:
+            page = pdf.pages[i]
+            if trace:
+                tracemalloc.reset_peak()
+            try:
+                yield i, page
+            finally:
+                page.close()
+            since_open += 1
+            if trace:
+                current, peak = tracemalloc.get_traced_memory()
+                mem_report.append({"page": i + 1, "peak_bytes": peak, "current_bytes": current})
+            if base is None or since_open < PAGE_REOPEN_MIN_PAGES:
                 continue
+            if rss_bytes() - base > mem_limit:
+                pdf.close()
+                pdf = pdfplumber.open(pdf_path)
+                base = rss_bytes()
+                since_open = 0
+    finally:
+        pdf.close()
+        if started:
+            tracemalloc.stop()
+
+def format_mem_report(mem_report) -> str:
+    """Короткая сводка по mem_report: максимум и самые тяжёлые страницы."""
+    if not mem_report:
+        return "mem report: empty"
+    top = sorted(mem_report, key=lambda r: r["peak_bytes"], reverse=True)[:5]
+    lines = [f"mem report: {len(mem_report)} pages, max peak {top[0]['peak_bytes'] / 2**20:.1f} MiB"]
+    for r in top:
+        lines.append(f"  page {r['page']}: peak {r['peak_bytes'] / 2**20:.1f} MiB, "
+                     f"after {r['current_bytes'] / 2**20:.1f} MiB")
+    return "\n".join(lines)
+
+# --- движок pdfminer: слова прямо из LTChar, без словарей символов pdfplumber ---
+
+ENGINES = ("pdfplumber", "pdfminer")
+
+# как expand_ligatures в pdfplumber
+LIGATURES = {"ﬀ": "ff", "ﬃ": "ffi", "ﬄ": "ffl", "ﬁ": "fi", "ﬂ": "fl", "ﬆ": "st", "ﬅ": "st"}
+
+def iter_ltchars(items):
+    """LTChar в порядке потока содержимого, включая символы внутри LTFigure."""
+    from pdfminer.layout import LTChar, LTContainer
+
+    for obj in items:
+        if isinstance(obj, LTChar):
+            yield obj
+        elif isinstance(obj, LTContainer):
+            yield from iter_ltchars(obj)
+
+def page_geometry(page_obj):
+    """(height, x0_shift, top_shift) — как Page.height/mediabox в pdfplumber."""
+    rotation = (page_obj.attrs.get("Rotate", 0) or 0) % 360
+    x0, x1 = sorted((page_obj.mediabox[0], page_obj.mediabox[2]))
+    y0, y1 = sorted((page_obj.mediabox[1], page_obj.mediabox[3]))
+    if rotation in (90, 270):
+        x0, y0, x1, y1 = y0, x0, y1, x1
+    height = y1 - y0
+    return height, x0, height - y1
+
+def ltchars_to_words(chars, height, x_shift=0, top_shift=0,
+                     x_tol=WORD_KW["x_tolerance"], y_tol=WORD_KW["y_tolerance"]):
+    """
+    Слова из LTChar по правилам extract_words(use_text_flow=True, keep_blank_chars=False):
+    разрыв на пробельном символе, на смене upright и по зазору между символами.
+    С use_text_flow WordExtractor сравнивает символы как горизонтальный текст (ltr) и для
+    повёрнутых (upright=False) — на страницах с /Rotate 90/270 таких большинство.
+    Возвращает словари text/x0/x1/top/bottom, как у pdfplumber.
+    """
+    words = []
+    word = None
+    prev = None
+    for ch in chars:
+        text = ch.get_text() or ""
+        upright = ch.upright
+        if word is not None and upright != word["upright"]:
+            words.append(word)
+            word = None
+        if text.isspace():
+            if word is not None:
+                words.append(word)
+            word = None
+            continue
+
+        x0, x1 = ch.x0 + x_shift, ch.x1 + x_shift
+        top, bottom = height - ch.y1 + top_shift, height - ch.y0 + top_shift
+        if word is not None:
+            if x0 < prev[0] or x0 > prev[1] + x_tol or abs(top - prev[2]) > y_tol:
+                words.append(word)
+                word = None
+        if word is None:
+            word = {"text": "", "x0": x0, "x1": x1, "top": top, "bottom": bottom, "upright": upright}
+        word["text"] += LIGATURES.get(text, text)
+        word["x0"] = min(word["x0"], x0)
+        word["x1"] = max(word["x1"], x1)
+        word["top"] = min(word["top"], top)
+        word["bottom"] = max(word["bottom"], bottom)
+        prev = (x0, x1, top, bottom)
+    if word is not None:
+        words.append(word)
+    return words
 
-            for hi in headers:
-                header_items = normalize_header(lines[hi])
-                if not header_items:
+def iter_pdfminer_page_words(pdf_path: str, indices=None):
+    """(i, words) по страницам (i с 0) через PDFPageAggregator без LAParams."""
+    from pdfminer.converter import PDFPageAggregator
+    from pdfminer.pdfdocument import PDFDocument
+    from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+    from pdfminer.pdfpage import PDFPage
+    from pdfminer.pdfparser import PDFParser
+
+    wanted = None if indices is None else set(indices)
+    with open(pdf_path, "rb") as fh:
+        doc = PDFDocument(PDFParser(fh))
+        rsrcmgr = PDFResourceManager(caching=True)
+        device = PDFPageAggregator(rsrcmgr, laparams=None)
+        interpreter = PDFPageInterpreter(rsrcmgr, device)
+        for i, page_obj in enumerate(PDFPage.create_pages(doc)):
+            if wanted is not None:
+                if not wanted:
+                    break
+                if i not in wanted:
                     continue
+                wanted.discard(i)
+            interpreter.process_page(page_obj)
+            layout = device.get_result()
+            height, x_shift, top_shift = page_geometry(page_obj)
+            yield i, ltchars_to_words(iter_ltchars(layout), height, x_shift, top_shift)
 
-                cols = [lab for lab,_ in header_items]
-                xs   = [x   for _,x in header_items]
-
-                bins = build_bins(xs)
-
-                # глобальный порядок динамических колонок
-                for lab in cols:
-                    if lab in REQ_FIRST or lab in REQ_LAST:
-                        continue
-                    if lab not in dynamic_order_global:
-                        dynamic_order_global.append(lab)
-
-                # строки под шапкой
-                stop_at = len(lines)
-                for hj in headers:
-                    if hj > hi:
-                        stop_at = min(stop_at, hj)
-
-                for li in range(hi+1, stop_at):
-                    ln = lines[li]
-                    if is_total_line(ln):
-                        break
-                    cells = assign_cells(ln, cols, bins)
-                    # фильтруем Tekijä:
-                    if any("tekijä:" in low_noacc(v) for v in cells.values() if v):
-                        continue
-                    # пустые строки выкидываем
-                    if not cells.get("Työntekijät") and not cells.get("Aika"):
-                        continue
-                    all_rows.append(cells)
+def parse_words_page(page_idx, words, y_tol=Y_TOL, profile=None, extract_seconds=0.0):
+    """Страница движка pdfminer: слова уже извлечены, дальше как parse_page."""
+    if profile is not None:
+        profile.start_page(page_idx)
+        profile.add("extract_words", extract_seconds)
+        profile.add("words", len(words))
+    sections, _ = parse_page_words(words, y_tol=y_tol, profile=profile)
+    if profile is not None:
+        profile.add("rows", sum(len(rows) for _, rows in sections))
+        profile.end_page()
+    return sections
 
-    # Собираем полный список колонок:
+def iter_pdfminer_sections(pdf_path: str, indices=None, profile=None):
+    """(page_idx, sections) движком pdfminer, page_idx с 1."""
+    it = iter_pdfminer_page_words(pdf_path, indices)
+    while True:
+        t0 = time.perf_counter() if profile is not None else 0.0
+        try:
+            i, words = next(it)
+        except StopIteration:
+            return
+        spent = time.perf_counter() - t0 if profile is not None else 0.0
+        yield i + 1, parse_words_page(i + 1, words, profile=profile, extract_seconds=spent)
+
+def compare_engines(pdf_path: str, tol: float = 0.01):
+    """
+    Сверка движков на одном PDF: список расхождений (page, описание) по словам
+    (текст и координаты с точностью tol) и по итоговым таблицам. Пустой список — совпадают.
+    """
+    def key(w):
+        return (w["text"], round(w["x0"] / tol), round(w["x1"] / tol), round(w["top"] / tol))
+
+    diffs = []
+    miner = iter_pdfminer_page_words(pdf_path)
+    for (i, page), (j, words) in zip(iter_pdf_pages(pdf_path), miner):
+        a = [key(w) for w in page.extract_words(**WORD_KW)]
+        b = [key(w) for w in words]
+        if a != b:
+            diffs.append((i + 1, f"words: pdfplumber {len(a)}, pdfminer {len(b)}, "
+                                 f"first diff at {next((k for k, (x, y) in enumerate(zip(a, b)) if x != y), min(len(a), len(b)))}"))
+
+    df_a = build_invoice_df(pdf_path, engine="pdfplumber")
+    df_b = build_invoice_df(pdf_path, engine="pdfminer")
+    if not df_a.equals(df_b):
+        diffs.append((None, f"tables differ: {df_a.shape} vs {df_b.shape}"))
+    return diffs
+
+def parse_page_list(pdf_path: str, indices, crop_table: bool = False, mem_limit: int | None = None,
+                    engine: str = "pdfplumber"):
+    """
+    Воркер для пула процессов: сам открывает PDF и разбирает страницы с индексами indices (с 0).
+    Возвращает (pages, stats): pages — список (page_idx, sections), page_idx с 1;
+    stats — прирост счётчиков для merge_worker_stats в родителе.
+    """
+    before = worker_stats_snapshot()
+    if engine == "pdfminer":
+        out = list(iter_pdfminer_sections(pdf_path, indices))
+    else:
+        out = []
+        crop_state = {} if crop_table else None
+        for i, page in iter_pdf_pages(pdf_path, indices, mem_limit=mem_limit):
+            out.append((i + 1, parse_page(page, crop_state=crop_state)))
+    return out, worker_stats_since(before)
+
+def parse_page_range(pdf_path: str, start: int, stop: int, crop_table: bool = False,
+                     mem_limit: int | None = None, engine: str = "pdfplumber"):
+    """Страницы [start, stop) — см. parse_page_list."""
+    return parse_page_list(pdf_path, range(start, stop), crop_table=crop_table, mem_limit=mem_limit,
+                           engine=engine)
+
+# --- постраничный кэш: переразбираем только новые/изменённые страницы ---
+
+def _pdf_obj_digest(obj, memo) -> bytes:
+    """
+    sha256 объекта PDF со всеми ссылками: словари по ключам, потоки — атрибуты и
+    распакованные данные. memo (objid -> digest) общий на документ, так что шрифты и
+    XObject'ы, которые делят страницы, хэшируются один раз; он же рвёт циклы ссылок.
+    """
+    from pdfminer.pdftypes import PDFObjRef, PDFStream
+    from pdfminer.psparser import PSLiteral, PSKeyword
+
+    if isinstance(obj, PDFObjRef):
+        if obj.objid in memo:
+            return memo[obj.objid]
+        memo[obj.objid] = b"cycle"
+        digest = _pdf_obj_digest(obj.resolve(), memo)
+        memo[obj.objid] = digest
+        return digest
+
+    h = hashlib.sha256()
+    if isinstance(obj, PDFStream):
+        h.update(b"S" + _pdf_obj_digest(obj.attrs, memo))
+        # сжатые байты, если поток ещё не распакован: для отпечатка их достаточно
+        h.update(obj.rawdata if obj.rawdata is not None else obj.get_data())
+    elif isinstance(obj, dict):
+        h.update(b"D")
+        for k in sorted(obj, key=str):
+            h.update(repr(k).encode("utf-8") + _pdf_obj_digest(obj[k], memo))
+    elif isinstance(obj, (list, tuple)):
+        h.update(b"L")
+        for v in obj:
+            h.update(_pdf_obj_digest(v, memo))
+    elif isinstance(obj, (PSLiteral, PSKeyword)):
+        h.update(b"N" + repr(obj.name).encode("utf-8"))
+    else:
+        h.update(b"V" + repr(obj).encode("utf-8"))
+    return h.digest()
+
+def page_fingerprint(page, memo=None, crop_table: bool = False) -> str:
+    """
+    sha256 потока содержимого страницы, её ресурсов (шрифты, Form XObject'ы со всем,
+    на что они ссылаются) + геометрии и параметров разбора. Без ресурсов страницы
+    вида "q /X0 Do Q" из разных PDF давали один отпечаток.
+    """
+    from pdfminer.pdftypes import resolve1
+
+    page_obj = page.page_obj
+    memo = {} if memo is None else memo
+    h = hashlib.sha256()
+    h.update(repr((PARSER_VERSION, sorted(WORD_KW.items()), Y_TOL, crop_table,
+                   tuple(page_obj.mediabox), page_obj.rotate)).encode("utf-8"))
+    for stream in page_obj.contents:
+        h.update(resolve1(stream).get_data())
+    h.update(_pdf_obj_digest(page_obj.resources, memo))
+    return h.hexdigest()
+
+def page_store_path(page_store: str, fp: str) -> Path:
+    return Path(page_store) / f"{fp}.pkl"
+
+def page_store_load(page_store: str, fp: str):
+    path = page_store_path(page_store, fp)
+    try:
+        with open(path, "rb") as f:
+            sections = pickle.load(f)
+    except Exception:
+        return None
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass  # вытеснена другим процессом после чтения
+    return sections
+
+def page_store_save(page_store: str, fp: str, sections):
+    Path(page_store).mkdir(parents=True, exist_ok=True)
+    path = page_store_path(page_store, fp)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump(sections, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+def iter_page_sections_incremental(pdf_path: str, page_store: str, workers: int = 1,
+                                   crop_table: bool = False, mem_limit: int | None = None,
+                                   mem_report=None, profile=None):
+    """
+    Как iter_page_sections, но результат каждой страницы хранится в page_store
+    по отпечатку page_fingerprint; заново разбираются только страницы без записи.
+    Размер page_store ограничивает cache_evict каталога кэша (см. cache_store) — один
+    лимит на записи документов и страниц вместе.
+    """
+    # отдельное открытие: декодированные потоки содержимого освобождаются вместе с документом
+    with pdfplumber.open(pdf_path) as pdf:
+        memo = {}
+        fps = [page_fingerprint(page, memo, crop_table) for page in pdf.pages]
+    stored = [page_store_path(page_store, fp).exists() for fp in fps]
+
+    if workers <= 1:
+        crop_state = {} if crop_table else None
+        for i, page in iter_pdf_pages(pdf_path, mem_limit=mem_limit, mem_report=mem_report):
+            sections = page_store_load(page_store, fps[i]) if stored[i] else None
+            if sections is None:
+                PAGE_STORE_STATS["misses"] += 1
+                sections = parse_page(page, crop_state=crop_state, profile=profile)
+                page_store_save(page_store, fps[i], sections)
+            else:
+                PAGE_STORE_STATS["hits"] += 1
+            yield i + 1, sections
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    missing = [i for i, ok in enumerate(stored) if not ok]
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as ex:
+        futures = iter([ex.submit(parse_page_list, pdf_path, missing[a:b], crop_table, mem_limit)
+                        for a, b in page_ranges(len(missing), workers * 4)] if missing else [])
+        fresh = {}
+        for i, fp in enumerate(fps):
+            sections = None
+            if stored[i]:
+                sections = page_store_load(page_store, fp)
+                if sections is None:  # запись испорчена — разбираем здесь же
+                    sections = parse_page_list(pdf_path, [i], crop_table)[0][0][1]
+                    page_store_save(page_store, fp, sections)
+                    PAGE_STORE_STATS["misses"] += 1
+                else:
+                    PAGE_STORE_STATS["hits"] += 1
+            else:
+                # результаты приходят по порядку диапазонов — дочитываем, пока не появится нужная страница
+                while i + 1 not in fresh:
+                    pages, stats = next(futures).result()
+                    merge_worker_stats(stats)
+                    for page_idx, secs in pages:
+                        page_store_save(page_store, fps[page_idx - 1], secs)
+                        fresh[page_idx] = secs
+                sections = fresh.pop(i + 1)
+                PAGE_STORE_STATS["misses"] += 1
+            yield i + 1, sections
+
+def page_ranges(n_pages: int, n_chunks: int):
+    """Делим [0, n_pages) на n_chunks непрерывных диапазонов."""
+    n_chunks = max(1, min(n_chunks, n_pages))
+    step, extra = divmod(n_pages, n_chunks)
+    ranges = []
+    start = 0
+    for k in range(n_chunks):
+        stop = start + step + (1 if k < extra else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+def iter_page_sections(pdf_path: str, workers: int = 1, page_store: str | None = None,
+                       crop_table: bool = False, mem_limit: int | None = None, mem_report=None,
+                       profile=None, engine: str = "pdfplumber"):
+    """
+    (page_idx, sections) в порядке страниц.
+    workers > 1 — страницы раздаются диапазонами в ProcessPoolExecutor,
+    результаты собираются обратно в исходном порядке.
+    page_store — каталог постраничного кэша (см. iter_page_sections_incremental).
+    crop_table — извлекать слова только из области таблицы (см. parse_page).
+    mem_limit, mem_report — см. iter_pdf_pages; mem_report и profile (ParseProfile)
+    заполняются только при последовательном разборе (workers <= 1).
+    engine — "pdfplumber" или "pdfminer" (слова напрямую из LTChar, см. ltchars_to_words);
+    page_store, crop_table, mem_limit и mem_report работают только с pdfplumber.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"unknown engine {engine!r}, expected one of {ENGINES}")
+    if engine == "pdfminer" and workers <= 1:
+        yield from iter_pdfminer_sections(pdf_path, profile=profile)
+        return
+
+    if page_store and engine == "pdfplumber":
+        yield from iter_page_sections_incremental(pdf_path, page_store, workers=workers,
+                                                  crop_table=crop_table, mem_limit=mem_limit,
+                                                  mem_report=mem_report, profile=profile)
+        return
+
+    if workers <= 1:
+        crop_state = {} if crop_table else None
+        for i, page in iter_pdf_pages(pdf_path, mem_limit=mem_limit, mem_report=mem_report):
+            yield i + 1, parse_page(page, crop_state=crop_state, profile=profile)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with pdfplumber.open(pdf_path) as pdf:
+        n_pages = len(pdf.pages)
+    if not n_pages:
+        return
+
+    # несколько диапазонов на воркер, чтобы длинные страницы не тормозили весь пул
+    ranges = page_ranges(n_pages, workers * 4)
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        futures = [ex.submit(parse_page_range, pdf_path, a, b, crop_table, mem_limit, engine)
+                   for a, b in ranges]
+        for fut in futures:
+            pages, stats = fut.result()
+            merge_worker_stats(stats)
+            yield from pages
+
+def update_dynamic_order(dynamic_order, cols):
+    """Дописываем в dynamic_order новые нестандартные колонки в порядке появления."""
+    for lab in cols:
+        if lab in REQ_FIRST or lab in REQ_LAST:
+            continue
+        if lab not in dynamic_order:
+            dynamic_order.append(lab)
+
+def iter_invoice_rows(pdf_path: str, workers: int = 1, dynamic_order=None, page_store: str | None = None,
+                      crop_table: bool = False, mem_limit: int | None = None, mem_report=None,
+                      profile=None, engine: str = "pdfplumber"):
+    """
+    Потоковый разбор: по одной строке (page_idx, header_sig, cells) по мере чтения PDF.
+    header_sig — кортеж колонок шапки, под которой стоит строка.
+    Если передан список dynamic_order, он пополняется порядком динамических колонок
+    (в т.ч. из шапок без строк) — так же, как в parse_pdf_any_columns.
+    """
+    for page_idx, sections in iter_page_sections(pdf_path, workers=workers, page_store=page_store,
+                                                 crop_table=crop_table, mem_limit=mem_limit,
+                                                 mem_report=mem_report, profile=profile,
+                                                 engine=engine):
+        for cols, rows in sections:
+            if dynamic_order is not None:
+                update_dynamic_order(dynamic_order, cols)
+            header_sig = tuple(cols)
+            for cells in rows:
+                yield page_idx, header_sig, cells
+
+def invoice_columns(dynamic_order):
+    """Полный список колонок: обязательные в начале, динамические, Kaikki yhteensä в конце."""
     all_cols = []
     for c in REQ_FIRST:
         if c not in all_cols:
             all_cols.append(c)
-    for c in dynamic_order_global:
+    for c in dynamic_order:
         if c not in all_cols and c not in REQ_LAST and c not in REQ_FIRST:
             all_cols.append(c)
     for c in REQ_LAST:
         if c not in all_cols:
             all_cols.append(c)
+    return all_cols
+
+def build_invoice_df(pdf_path: str, workers: int = 1, page_store: str | None = None,
+                     crop_table: bool = False, mem_limit: int | None = None,
+                     mem_report=None, profile=None, engine: str = "pdfplumber") -> pd.DataFrame:
+    dynamic_order_global = []  # порядок появления нестандартных колонок
+    all_rows = [cells for _, _, cells in iter_invoice_rows(pdf_path, workers=workers,
+                                                           dynamic_order=dynamic_order_global,
+                                                           page_store=page_store,
+                                                           crop_table=crop_table,
+                                                           mem_limit=mem_limit,
+                                                           mem_report=mem_report,
+                                                           profile=profile,
+                                                           engine=engine)]
+
+    # Собираем полный список колонок:
+    all_cols = invoice_columns(dynamic_order_global)
 
     df = pd.DataFrame(all_rows)
     for c in all_cols:
@@ -217,62 +974,453 @@ def parse_pdf_any_columns(pdf_path: str) -> pd.DataFrame:
     df = df[all_cols]
 
     # финальная подстраховка против Tekijä:
-    mask = df.apply(lambda r: not any("tekijä:" in str(v).lower() for v in r.values), axis=1)
-    df = df[mask].reset_index(drop=True)
+    return clean_invoice_df(df)
+
+def clean_invoice_df(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Финальная подстраховка по колонкам (векторные строковые операции): строки с
+    "Tekijä:" в любой ячейке выкидываются. Скобки и пустые строки убирает сам разбор
+    (assign_cells, parse_page_words) — второй раз по каждой ячейке их не гоняем.
+    """
+    keep = pd.Series(True, index=df.index)
+    for c in df.columns:
+        col = df[c]
+        if pd.api.types.is_string_dtype(col.dtype):
+            keep &= ~col.str.lower().str.contains(TEKIJA_MARK, regex=False, na=False)
+    return df[keep].reset_index(drop=True)
+
+# --- дисковый кэш разобранных счетов ---
+
+def parse_cache_key(pdf_path: str, engine: str = "pdfplumber", crop_table: bool = False) -> str:
+    """sha256 содержимого PDF + версия парсера + параметры извлечения, движок и режим обрезки."""
+    h = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    params = repr((PARSER_VERSION, sorted(WORD_KW.items()), Y_TOL, engine, crop_table))
+    h.update(params.encode("utf-8"))
+    return h.hexdigest()
+
+def cache_load(cache_dir: str, key: str):
+    path = Path(cache_dir) / f"{key}.pkl"
+    if not path.exists():
+        return None
+    try:
+        df = pd.read_pickle(path)
+    except Exception:
+        return None  # битая запись — просто перечитаем PDF
+    try:
+        os.utime(path)  # mtime = время последнего использования (для LRU)
+    except FileNotFoundError:
+        pass  # запись уже вытеснил cache_evict другого процесса (-j) — df прочитан, этого хватит
     return df
 
-if __name__ == "__main__":
-    # парсим оба файла
-    df_w21 = parse_pdf_any_columns(PDF_PATH_W21)
-    df_w22 = parse_pdf_any_columns(PDF_PATH_W22)
-
-    # переименуем колонки в обоих датафреймах
-    rename_map = {
-        "Työntekijät": "Name",
-        "Aika": "Dates",
-        "Iltalisä": "Evening shift bonus",
-        "Yövuoro": "Night shift bonus",
-        "Kaikki yhteensä": "Salary",
-    }
-
-    df_w21 = df_w21.rename(columns={old: new for old, new in rename_map.items() if old in df_w21.columns})
-    df_w22 = df_w22.rename(columns={old: new for old, new in rename_map.items() if old in df_w22.columns})
-
-    # --- функция: разделить Name -> Name + Surname ---
-    def add_surname(df: pd.DataFrame) -> pd.DataFrame:
-        if "Name" not in df.columns:
-            return df
-
-        def split_name(full):
-            if not isinstance(full, str) or not full.strip():
-                return "", ""
-            parts = full.strip().split(" ", 1)
-            if len(parts) == 1:
-                return parts[0], ""
-            return parts[0], parts[1]
-
-        first_list, last_list = zip(*df["Name"].map(split_name))
-        df = df.copy()
-        df["Name"] = list(first_list)
-        df["Surname"] = list(last_list)
-
-        # поставить Surname сразу после Name
-        cols = df.columns.tolist()
-        cols.remove("Surname")
-        cols.insert(cols.index("Name") + 1, "Surname")
-        df = df[cols]
+def cache_store(cache_dir: str, key: str, df: pd.DataFrame, max_bytes: int = PARSE_CACHE_MAX_BYTES):
+    d = Path(cache_dir)
+    d.mkdir(parents=True, exist_ok=True)
+    path = d / f"{key}.pkl"
+    tmp = d / f"{key}.{os.getpid()}.tmp"
+    df.to_pickle(tmp)
+    os.replace(tmp, path)
+    cache_evict(cache_dir, max_bytes)
+
+def cache_evict(cache_dir: str, max_bytes: int):
+    """
+    Удаляем самые давно использованные записи, пока кэш не уложится в max_bytes.
+    Считаются и записи страниц в cache_dir/pages — лимит общий на весь каталог.
+    """
+    entries = []
+    for p in Path(cache_dir).rglob("*.pkl"):
+        try:
+            st = p.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((st.st_mtime, st.st_size, p))
+    total = sum(size for _, size, _ in entries)
+    for _, size, p in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            p.unlink()
+        except FileNotFoundError:
+            pass
+        total -= size
+
+# --- типизированный вывод ---
+
+def fi_to_float(col: pd.Series) -> pd.Series:
+    """
+    Финская запись чисел -> float: '7,5', '1 234,50', '1.234,50', '−3,0'.
+    Пустые ячейки -> NaN, нечисловые тоже NaN (см. typed_invoice_df).
+    """
+    t = (col.astype("string")
+            .str.replace("\u00A0", "", regex=False)
+            .str.replace(" ", "", regex=False)
+            .str.replace("\u2212", "-", regex=False))
+    both = t.str.contains(",", regex=False, na=False) & t.str.contains(".", regex=False, na=False)
+    t = t.where(~both, t.str.replace(".", "", regex=False))
+    t = t.str.replace(",", ".", regex=False)
+    return pd.to_numeric(t.mask(t == ""), errors="coerce").astype("float64")
+
+def typed_invoice_df(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Колонки TEXT_COLS -> category, остальные -> NUM_DTYPE по финским правилам.
+    Колонка, где хотя бы одна непустая ячейка не число, остаётся текстовой.
+    """
+    out = {}
+    for c in df.columns:
+        col = df[c]
+        if c in TEXT_COLS:
+            out[c] = col.astype("category")
+            continue
+        if not pd.api.types.is_string_dtype(col.dtype):
+            continue
+        num = fi_to_float(col)
+        filled = col.notna() & (col.astype("string").str.strip() != "")
+        if (num.isna() & filled).any():
+            continue
+        out[c] = num.astype(NUM_DTYPE)
+    return df.assign(**out) if out else df
+
+def parse_pdf_any_columns(pdf_path: str, workers: int = 1, cache_dir: str | None = None,
+                          crop_table: bool = False, mem_limit: int | None = None,
+                          mem_report=None, typed: bool = False, profile=None,
+                          engine: str = "pdfplumber") -> pd.DataFrame:
+    """
+    Разбор счёта в DataFrame. Если задан cache_dir — результат берётся из/кладётся
+    в дисковый кэш по ключу parse_cache_key. При промахе (например, счёт перевыпущен
+    с дополнительными страницами) заново разбираются только новые/изменённые страницы —
+    результаты страниц лежат в cache_dir/pages.
+    typed — числа как float32, имена/даты как category (см. typed_invoice_df).
+    profile — ParseProfile для замеров по стадиям и страницам.
+    engine — "pdfplumber" (по умолчанию) или "pdfminer", см. iter_page_sections.
+    """
+    if not cache_dir:
+        df = build_invoice_df(pdf_path, workers=workers, crop_table=crop_table,
+                              mem_limit=mem_limit, mem_report=mem_report, profile=profile,
+                              engine=engine)
+        return typed_invoice_df(df) if typed else df
+
+    key = parse_cache_key(pdf_path, engine, crop_table)
+    df = cache_load(cache_dir, key)
+    if df is None:
+        df = build_invoice_df(pdf_path, workers=workers, page_store=str(Path(cache_dir) / "pages"),
+                              crop_table=crop_table, mem_limit=mem_limit, mem_report=mem_report,
+                              profile=profile, engine=engine)
+        cache_store(cache_dir, key, df)
+    # в кэше лежит текстовая таблица — типизация поверх неё
+    return typed_invoice_df(df) if typed else df
+
+# --- подготовка недель к записи в Excel ---
+
+# переименование колонок для tyontekijat_weeks.xlsx
+RENAME_MAP = {
+    "Työntekijät": "Name",
+    "Aika": "Dates",
+    "Iltalisä": "Evening shift bonus",
+    "Yövuoro": "Night shift bonus",
+    "Kaikki yhteensä": "Salary",
+}
+
+# Как делить "Työntekijät" на Name + Surname:
+#   "first" — имя = первое слово, фамилия = всё остальное ("Anna Maria Virtanen" -> "Anna", "Maria Virtanen")
+#   "last"  — фамилия = последнее слово вместе с частицами перед ним ("Jan van der Berg" -> "Jan", "van der Berg")
+NAME_SPLIT = "first"
+SURNAME_PARTICLES = ["af", "von", "van", "der", "den", "de", "la", "le", "di", "da", "dos", "del", "bin", "al"]
+
+def _split_unique(names: pd.Series, rule: str):
+    """(имена, фамилии) — object-массивы для уникальных значений колонки; не строки -> ""."""
+    s = names.where(names.map(lambda v: isinstance(v, str)), "").astype(str).str.strip()
+    if rule == "first":
+        parts = s.str.partition(" ").reindex(columns=[0, 1, 2])
+        first, last = parts[0], parts[2]
+    elif rule == "last":
+        particles = "|".join(SURNAME_PARTICLES)
+        parts = s.str.extract(rf"^(.*?)\s+((?:(?i:{particles})\s+)*\S+)$")
+        first, last = parts[0].fillna(s), parts[1]
+    else:
+        raise ValueError(f"неизвестное правило деления имени: {rule!r} (first, last)")
+    # в конец добавлен "" — на него попадает код -1 (NaN) в split_names
+    return (np.append(first.fillna("").to_numpy(dtype=object), ""),
+            np.append(last.fillna("").to_numpy(dtype=object), ""))
+
+def split_names(names: pd.Series, rule: str = NAME_SPLIT) -> tuple[pd.Series, pd.Series]:
+    """
+    (имя, фамилия) для колонки имён; пустые и NaN -> "". Строковыми операциями pandas
+    делятся только уникальные значения (один сотрудник — много строк, несколько клиентов),
+    результат раскладывается по кодам. category остаётся category.
+    """
+    if isinstance(names.dtype, pd.CategoricalDtype):
+        codes, uniques = names.cat.codes.to_numpy(), names.cat.categories.astype(object)
+    else:
+        codes, uniques = pd.factorize(names)
+    first, last = _split_unique(pd.Series(uniques, dtype=object), rule)
+    if isinstance(names.dtype, pd.CategoricalDtype):
+        return (pd.Series(pd.Categorical(first[codes]), index=names.index),
+                pd.Series(pd.Categorical(last[codes]), index=names.index))
+    return (pd.Series(first[codes], index=names.index, dtype=str),
+            pd.Series(last[codes], index=names.index, dtype=str))
+
+# --- функция: разделить Name -> Name + Surname ---
+def add_surname(df: pd.DataFrame, rule: str = NAME_SPLIT) -> pd.DataFrame:
+    if "Name" not in df.columns:
         return df
 
-    # применяем к обоим неделям
-    df_w21 = add_surname(df_w21)
-    df_w22 = add_surname(df_w22)
+    first, last = split_names(df["Name"], rule)
+    pos = df.columns.get_loc("Name")
+    df = df.drop(columns=["Surname"], errors="ignore").assign(Name=first)
+    df.insert(pos + 1, "Surname", last)
+    return df
+
+def prepare_week_df(df: pd.DataFrame, name_split: str = NAME_SPLIT) -> pd.DataFrame:
+    df = df.rename(columns={old: new for old, new in RENAME_MAP.items() if old in df.columns})
+    return add_surname(df, name_split)
+
+def week_sheet_name(n: int) -> str:
+    """1 -> '1st week', 2 -> '2nd week', ... (эти имена читает scratch_10)."""
+    suffix = "th" if 10 <= n % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+    return f"{n}{suffix} week"
+
+def natural_key(name: str):
+    """Ключ сортировки с числами по значению: "w9" < "w10"."""
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", name.lower())]
+
+def find_invoice_pdfs(inputs) -> list[str]:
+    """Каталоги (все *.pdf внутри), glob-шаблоны и пути к файлам -> отсортированный список PDF."""
+    found = []
+    for item in inputs:
+        if os.path.isdir(item):
+            found.extend(glob.glob(os.path.join(item, "*.pdf")) + glob.glob(os.path.join(item, "*.PDF")))
+        elif glob.has_magic(item):
+            found.extend(glob.glob(item))
+        else:
+            found.append(item)
+    # порядок недель — по имени файла (w9 ..., w10 ..., w21 ...), числа сравниваются как числа
+    return sorted(dict.fromkeys(os.path.normpath(p) for p in found), key=lambda p: natural_key(os.path.basename(p)))
+
+def parse_invoices(pdf_paths, jobs: int = 1, **parse_kw) -> list[pd.DataFrame]:
+    """
+    Разбор нескольких счетов, jobs > 1 — параллельно по документам (jobs=0 — по процессу
+    на PDF, не больше числа CPU); порядок как у pdf_paths. Крупные PDF отправляются в пул
+    первыми, чтобы общее время было ближе к самому долгому документу, а не к сумме.
+    """
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    if jobs <= 1 or len(pdf_paths) <= 1:
+        return [parse_pdf_any_columns(p, **parse_kw) for p in pdf_paths]
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    by_size = sorted(range(len(pdf_paths)), key=lambda i: os.path.getsize(pdf_paths[i]), reverse=True)
+    with ProcessPoolExecutor(max_workers=min(jobs, len(pdf_paths))) as ex:
+        futures = {i: ex.submit(parse_invoice_job, pdf_paths[i], **parse_kw) for i in by_size}
+        dfs = []
+        for i in range(len(pdf_paths)):
+            df, stats = futures[i].result()
+            merge_worker_stats(stats)
+            dfs.append(df)
+        return dfs
+
+def parse_invoice_job(pdf_path: str, **parse_kw):
+    """Воркер parse_invoices: (DataFrame, прирост счётчиков) — см. parse_page_list."""
+    before = worker_stats_snapshot()
+    df = parse_pdf_any_columns(pdf_path, **parse_kw)
+    return df, worker_stats_since(before)
+
+def merge_dynamic_orders(orders) -> list:
+    """
+    Общий порядок динамических колонок нескольких счетов. Колонки первого счёта идут
+    как есть; новая колонка следующего встаёт сразу за своей соседкой слева из того же
+    счёта, а без неё — перед ближайшей уже известной соседкой справа или в конец.
+    При противоречии побеждает более ранний счёт.
+    """
+    merged = []
+    for order in orders:
+        order = list(order)
+        pos = None
+        for k, lab in enumerate(order):
+            if lab in merged:
+                pos = merged.index(lab) + 1
+                continue
+            if pos is None:
+                pos = next((merged.index(o) for o in order[k + 1:] if o in merged), len(merged))
+            merged.insert(pos, lab)
+            pos += 1
+    return merged
 
-    print("1st week rows:", len(df_w21))
-    print("2nd week rows:", len(df_w22))
+def align_invoice_dfs(dfs, fill_missing: bool = False, typed: bool = False) -> list[pd.DataFrame]:
+    """
+    Колонки всех счетов в одном порядке (invoice_columns от merge_dynamic_orders).
+    fill_missing — добавить колонки, которых в счёте нет: "" (или NaN float32 при typed).
+    """
+    fixed = set(REQ_FIRST) | set(REQ_LAST)
+    all_cols = invoice_columns(merge_dynamic_orders([c for c in df.columns if c not in fixed] for df in dfs))
+    out = []
+    for df in dfs:
+        if not fill_missing:
+            out.append(df[[c for c in all_cols if c in df.columns]])
+            continue
+        missing = [c for c in all_cols if c not in df.columns]
+        if typed:
+            df = df.assign(**{c: pd.Series(np.nan, index=df.index, dtype=NUM_DTYPE) for c in missing})
+        else:
+            df = df.assign(**{c: "" for c in missing})
+        out.append(df[all_cols])
+    return out
 
-    # записываем в один Excel с двумя листами
-    with pd.ExcelWriter(OUT_XLSX, engine="openpyxl") as writer:
-        df_w21.to_excel(writer, sheet_name="1st week", index=False)
-        df_w22.to_excel(writer, sheet_name="2nd week", index=False)
+def excel_ready(df: pd.DataFrame) -> pd.DataFrame:
+    """float32 -> float64 с округлением, иначе в Excel попадёт 9.399999618530273 вместо 9.4."""
+    f32 = {c: df[c].astype("float64").round(6) for c in df.columns if df[c].dtype == "float32"}
+    return df.assign(**f32) if f32 else df
+
+def write_weeks_xlsx(week_dfs, out_xlsx: str = OUT_XLSX, long: bool = False, sources=None):
+    """
+    Лист на неделю ('1st week', '2nd week', ...) или, при long=True, одна таблица
+    'weeks' с колонкой Week (и Source — имя PDF, если передан sources).
+    """
+    with pd.ExcelWriter(out_xlsx, engine="openpyxl") as writer:
+        if not long:
+            for n, df in enumerate(week_dfs, start=1):
+                excel_ready(df).to_excel(writer, sheet_name=week_sheet_name(n), index=False)
+            return
+        parts = []
+        for n, df in enumerate(week_dfs, start=1):
+            df = df.copy()
+            df.insert(0, "Week", week_sheet_name(n))
+            if sources is not None:
+                df.insert(1, "Source", os.path.basename(sources[n - 1]))
+            parts.append(df)
+        df_long = pd.concat(parts, ignore_index=True)
+        # итоговая колонка остаётся последней, как и в листах по неделям
+        salary = RENAME_MAP[REQ_LAST[0]]
+        if salary in df_long.columns:
+            df_long = df_long[[c for c in df_long.columns if c != salary] + [salary]]
+        excel_ready(df_long).to_excel(writer, sheet_name="weeks", index=False)
+
+def write_weeks_arrow(week_dfs, out_dir: str = OUT_WEEKS_DIR, sources=None) -> Path:
+    """
+    Недели в out_dir: '1st_week.arrow', '2nd_week.arrow', ... (Arrow IPC без сжатия)
+    и манифест weeks.json со списком листов, файлов, числа строк и исходных PDF.
+    Типы колонок сохраняются как есть (float32, category) — без округления для Excel.
+    """
+    try:
+        import pyarrow.feather as feather
+    except ImportError as e:
+        raise RuntimeError("для колоночного хранилища нужен pyarrow (pip install pyarrow)") from e
 
-    print(f"Saved: {Path(OUT_XLSX).resolve()}")
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    weeks = []
+    for n, df in enumerate(week_dfs, start=1):
+        sheet = week_sheet_name(n)
+        fname = sheet.replace(" ", "_") + ".arrow"
+        feather.write_feather(df.reset_index(drop=True), out / fname, compression="uncompressed")
+        weeks.append({"sheet": sheet, "file": fname, "rows": len(df),
+                      "source": os.path.basename(sources[n - 1]) if sources is not None else None})
+    # недели от прошлого, более длинного запуска
+    keep = {w["file"] for w in weeks}
+    for f in out.glob("*.arrow"):
+        if f.name not in keep:
+            f.unlink()
+    manifest = {"parser_version": PARSER_VERSION, "weeks": weeks}
+    (out / WEEKS_MANIFEST).write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    return out
+
+def drop_weeks_store(out_dir: str = OUT_WEEKS_DIR) -> bool:
+    """
+    Убрать хранилище прошлого запуска (weeks.json и его *.arrow), чтобы scratch_10 не
+    прочёл старые недели, когда этот запуск хранилище не пишет. True — было что убирать.
+    """
+    out = Path(out_dir)
+    manifest = out / WEEKS_MANIFEST
+    if not manifest.exists():
+        return False
+    try:
+        files = [w["file"] for w in json.loads(manifest.read_text(encoding="utf-8"))["weeks"]]
+    except (ValueError, KeyError, TypeError):
+        files = []
+    # сначала манифест: без него хранилище уже не читается, даже если файл недели занят
+    manifest.unlink()
+    for f in files:
+        (out / f).unlink(missing_ok=True)
+    return True
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Счета субподрядчика (PDF) по неделям -> tyontekijat_weeks.xlsx")
+    ap.add_argument("inputs", nargs="*",
+                    help="каталоги, glob-шаблоны или PDF по неделям (по умолчанию PDF_PATH_W21/W22)")
+    ap.add_argument("-o", "--out", default=OUT_XLSX)
+    ap.add_argument("--store", default=OUT_WEEKS_DIR, help="каталог колоночного хранилища для scratch_10")
+    ap.add_argument("--no-store", action="store_true",
+                    help="не писать колоночное хранилище (старое из --store удаляется)")
+    ap.add_argument("--no-xlsx", action="store_true", help="не писать xlsx (scratch_10 читает хранилище)")
+    ap.add_argument("-j", "--jobs", type=int, default=1, help="сколько PDF разбирать параллельно (0 — все сразу)")
+    ap.add_argument("--workers", type=int, default=WORKERS, help="пул процессов по страницам внутри PDF")
+    ap.add_argument("--long", action="store_true", help="одна таблица с колонкой Week вместо листа на неделю")
+    ap.add_argument("--same-columns", action="store_true",
+                    help="во всех неделях одинаковый набор колонок (недостающие — пустые)")
+    ap.add_argument("--no-cache", action="store_true", help="не использовать PARSE_CACHE_DIR")
+    ap.add_argument("--crop-table", action="store_true", default=CROP_TABLE)
+    ap.add_argument("--typed", action="store_true", help="часы/суммы как числа, имена/даты как категории")
+    ap.add_argument("--name-split", choices=["first", "last"], default=NAME_SPLIT,
+                    help="first — фамилия всё после первого слова, last — последнее слово с частицами")
+    ap.add_argument("--engine", choices=ENGINES, default="pdfplumber",
+                    help="pdfminer — слова прямо из LTChar (быстрее, см. compare_engines)")
+    ap.add_argument("--profile", metavar="JSON",
+                    help="записать время по стадиям/страницам (только при -j 1 и --workers 1; "
+                         "кэш разбора при этом не используется)")
+    args = ap.parse_args(argv)
+    if args.no_store and args.no_xlsx:
+        ap.error("--no-store и --no-xlsx вместе: результат некуда писать")
+
+    pdf_paths = find_invoice_pdfs(args.inputs) if args.inputs else [PDF_PATH_W21, PDF_PATH_W22]
+    if not pdf_paths:
+        ap.error("PDF не найдены")
+
+    # при разборе документов параллельно страницы внутри документа — последовательно
+    serial = args.jobs == 1 or len(pdf_paths) == 1
+    workers = args.workers if serial else 1
+    mem_reports = [[] if MEM_REPORT and serial else None for _ in pdf_paths]
+    profiles = [ParseProfile() if args.profile and serial else None for _ in pdf_paths]
+    # --profile мерит разбор, а из кэша пришли бы нули — кэш выключаем
+    no_cache = args.no_cache or bool(args.profile)
+    parse_kw = dict(workers=workers, cache_dir=None if no_cache else PARSE_CACHE_DIR,
+                    crop_table=args.crop_table, mem_limit=PAGE_MEM_LIMIT, typed=args.typed,
+                    engine=args.engine)
+    if not serial:
+        week_dfs = parse_invoices(pdf_paths, jobs=args.jobs, **parse_kw)
+    else:
+        week_dfs = [parse_pdf_any_columns(p, mem_report=r, profile=prof, **parse_kw)
+                    for p, r, prof in zip(pdf_paths, mem_reports, profiles)]
+
+    # общий порядок динамических колонок для всех недель (в long-таблице — и общий набор)
+    week_dfs = align_invoice_dfs(week_dfs, fill_missing=args.same_columns or args.long, typed=args.typed)
+    week_dfs = [prepare_week_df(df, args.name_split) for df in week_dfs]
+
+    for n, (path, df, rep) in enumerate(zip(pdf_paths, week_dfs, mem_reports), start=1):
+        print(f"{week_sheet_name(n)} rows:", len(df), "-", os.path.basename(path))
+        if rep is not None:
+            print(format_mem_report(rep))
+    layout = layout_cache_info()
+    if not serial or workers > 1:
+        del layout["size"]  # у каждого процесса пула свой кэш шапок, размер родителя ни о чём
+    print("header layout cache:", layout)
+    print("page store:", PAGE_STORE_STATS)
+
+    if args.profile:
+        reports = {os.path.basename(p): prof.report() for p, prof in zip(pdf_paths, profiles) if prof is not None}
+        Path(args.profile).write_text(json.dumps(reports, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"Profile: {Path(args.profile).resolve()}")
+
+    # xlsx первым: scratch_10 читает то, что новее, а при обоих выходах это хранилище
+    if not args.no_xlsx:
+        write_weeks_xlsx(week_dfs, args.out, long=args.long, sources=pdf_paths)
+        print(f"Saved: {Path(args.out).resolve()}")
+    if not args.no_store:
+        out = write_weeks_arrow(week_dfs, args.store, sources=pdf_paths)
+        print(f"Saved: {out.resolve()}")
+    elif drop_weeks_store(args.store):
+        print(f"Removed stale store: {Path(args.store).resolve()}")
+
+if __name__ == "__main__":
+    main()